@@ -0,0 +1,76 @@
+"""Benchmark find_main_content_area against the old per-element get_text() scan.
+
+    python scrape/benchmarks/bench_content_area.py [--rounds N]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from pages import corpus_pages, load_corpus
+from scrape_qna import BibelQAScraper
+
+
+def legacy_find_main_content_area(soup):
+    """The original implementation: one get_text() call per candidate"""
+    candidates = []
+    for table in soup.find_all('table'):
+        text_length = len(table.get_text(strip=True))
+        if text_length > 300:
+            candidates.append(('table', text_length, table))
+    for div in soup.find_all('div', class_=re.compile(r'content|main|body|newspaper')):
+        text_length = len(div.get_text(strip=True))
+        if text_length > 100:
+            candidates.append(('div', text_length, div))
+    for container in soup.find_all(['article', 'section', 'main', 'td']):
+        text_length = len(container.get_text(strip=True))
+        if text_length > 300:
+            candidates.append(('container', text_length, container))
+    if candidates:
+        candidates.sort(key=lambda x: x[1], reverse=True)
+        return candidates[0][2]
+    return soup.find('body')
+
+
+def time_call(func, soups, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for soup in soups:
+            func(soup)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    scraper = BibelQAScraper()
+    records = load_corpus()
+    page_sets = [
+        ('saved pages', corpus_pages(records)),
+        ('large (x8 body)', corpus_pages(records, repeat=8)),
+        ('deep (12 levels)', corpus_pages(records, nesting=12)),
+        ('large + deep', corpus_pages(records, repeat=8, nesting=12)),
+    ]
+
+    print(f"{'pages':<20}{'legacy ms':>12}{'single-pass ms':>16}{'speedup':>10}")
+    for label, pages in page_sets:
+        soups = [BeautifulSoup(content, 'html.parser') for _, content in pages]
+        for soup in soups:
+            if legacy_find_main_content_area(soup) is not scraper.find_main_content_area(soup):
+                raise SystemExit(f"{label}: single-pass scorer picked a different content area")
+        legacy = time_call(legacy_find_main_content_area, soups, args.rounds)
+        single = time_call(scraper.find_main_content_area, soups, args.rounds)
+        print(f"{label:<20}{legacy * 1000:>12.1f}{single * 1000:>16.1f}{legacy / single:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
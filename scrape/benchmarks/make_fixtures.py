@@ -0,0 +1,85 @@
+"""Write the benchmark fixture corpus to scrape/benchmarks/fixtures/.
+
+    python scrape/benchmarks/make_fixtures.py
+
+One QandA.php page per record in bibel_qa_data.json, a listing page
+linking to all of them, and a few large or pathological pages. The
+manifest maps each `sel` value to its file.
+"""
+import html
+import json
+import os
+
+from pages import build_page, load_corpus
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def listing_page(entries):
+    links = '\n'.join(
+        f'<li><a href="./QandA.php?sel={sel}&qtype={qtype}&origin=homepage#anchor-name">{html.escape(question)}</a></li>'
+        for sel, qtype, question in entries
+    )
+    return f"""<!DOCTYPE html>
+<html lang="sv">
+<head><meta charset="utf-8"><title>Frågor och svar</title></head>
+<body>
+<table class="layout"><tr><td class="main">
+<h2>Frågor och svar</h2>
+<a href="./QandA.php?sel=0&qtype=other&origin=homepage">Alla frågor</a>
+<ul>
+{links}
+</ul>
+</td></tr></table>
+</body>
+</html>
+"""
+
+
+def pathological_pages(records):
+    """(name, question, page) for pages that stress a particular code path"""
+    longest = max(records, key=lambda r: len(r['answer_content']))
+    mojibake = dict(longest, answer_content=longest['answer_content'].encode('utf-8').decode('cp1252', errors='replace'))
+    br_flood = dict(longest, answer_content='\n'.join(longest['answer_content'].split()))
+    empty = dict(longest, answer_content='')
+    return [
+        ('large', 'Stor sida: det längsta svaret upprepat 40 gånger', build_page(longest, repeat=40)),
+        ('deep', 'Djup sida: svaret inbäddat i 120 nivåer', build_page(longest, nesting=120)),
+        ('mojibake', 'Sida med felkodade tecken (UTF-8 läst som cp1252)', build_page(mojibake)),
+        ('br_flood', 'Sida med ett ord per rad och tusentals radbrytningar', build_page(br_flood)),
+        ('empty', 'Sida utan svarstext', build_page(empty)),
+    ]
+
+
+def main():
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    records = load_corpus()
+    manifest = {}
+    entries = []
+
+    def write(name, content):
+        with open(os.path.join(FIXTURES_DIR, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    for record in records:
+        name = f"qanda_{record['id']}.html"
+        write(name, build_page(record))
+        manifest[record['id']] = name
+        entries.append((record['id'], record['type'], record['question']))
+
+    for n, (label, question, page) in enumerate(pathological_pages(records), 9001):
+        name = f"qanda_{label}.html"
+        write(name, page)
+        manifest[str(n)] = name
+        entries.append((str(n), 'other', question))
+
+    write('listing.html', listing_page(entries))
+    manifest['0'] = 'listing.html'
+
+    with open(os.path.join(FIXTURES_DIR, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Wrote {len(manifest)} fixture pages to {FIXTURES_DIR}")
+
+
+if __name__ == '__main__':
+    main()
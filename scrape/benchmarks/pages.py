@@ -0,0 +1,68 @@
+"""Synthetic QandA.php pages built from the saved scrape output.
+
+The pages mimic the bibel.se layout (navigation table, question in italics,
+answer paragraphs in a content td) so benchmarks can run without the network.
+"""
+import html
+import json
+import os
+
+SCRAPE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_FILE = os.path.join(SCRAPE_DIR, 'bibel_qa_data.json')
+
+
+def load_corpus(filename=CORPUS_FILE):
+    with open(filename, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def answer_html(answer):
+    """Answer text as nested paragraph markup"""
+    paragraphs = []
+    for para in answer.split('\n\n'):
+        lines = '<br>\n'.join(html.escape(line) for line in para.split('\n'))
+        paragraphs.append(f'<div class="newspaper"><p><span>{lines}</span></p></div>')
+    return '\n'.join(paragraphs)
+
+
+def build_page(record, repeat=1, nesting=0):
+    """Build a QandA.php-like page for a record
+
+    repeat duplicates the answer body to make large pages, nesting wraps the
+    answer in extra table/div levels to make deep pages.
+    """
+    body = '\n<hr>\n'.join(answer_html(record['answer_content']) for _ in range(repeat))
+    for level in range(nesting):
+        if level % 2:
+            body = f'<div class="content">{body}</div>'
+        else:
+            body = f'<table><tr><td>{body}</td></tr></table>'
+    question = html.escape(record['question'])
+    return f"""<!DOCTYPE html>
+<html lang="sv">
+<head>
+<meta charset="utf-8">
+<title>Frågor och svar</title>
+<style>body {{ font-family: serif; }}</style>
+<script>var origin = "homepage";</script>
+</head>
+<body>
+<header><nav><a href="index.php">Start</a> <a href="QandA.php?sel=0&qtype=other">Frågor</a></nav></header>
+<table class="layout">
+<tr><td class="menu"><a href="./QandA.php?sel=0&qtype=other&origin=homepage">Tillbaka till frågelistan</a><a href="index.php">Tillbaka till startsidan</a></td></tr>
+<tr><td class="main">
+<h3>Fråga {html.escape(record['id'])}</h3>
+<p><i>{question}</i></p>
+{body}
+</td></tr>
+</table>
+<footer>Svenska Reformationsbibeln</footer>
+</body>
+</html>
+"""
+
+
+def corpus_pages(records=None, repeat=1, nesting=0):
+    """(id, page bytes) for every record in the corpus"""
+    records = records if records is not None else load_corpus()
+    return [(r['id'], build_page(r, repeat, nesting).encode('utf-8')) for r in records]
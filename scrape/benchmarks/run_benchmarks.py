@@ -0,0 +1,262 @@
+"""Offline benchmark suite for the Q&A scraper.
+
+    python scrape/benchmarks/run_benchmarks.py [--rounds N] [--latency S] [--concurrency N]
+    python scrape/benchmarks/run_benchmarks.py --update-golden
+
+Every stage runs in a fresh process against the fixture corpus (see
+make_fixtures.py), so its peak RSS is its own. Network stages talk to the
+local stand-in server. Extracted text is compared with fixtures/golden.json
+first, so a speedup cannot silently change the output; run with
+--update-golden after an intended change to the extraction.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrape_qna import BibelQAScraper
+from template_cache import TemplateCache
+from standin_server import FIXTURES_DIR, StandInServer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+GOLDEN_FILE = os.path.join(FIXTURES_DIR, 'golden.json')
+
+
+def load_fixtures():
+    """{sel: page bytes} for every fixture page except the listing"""
+    with open(os.path.join(FIXTURES_DIR, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    pages = {}
+    for sel, name in manifest.items():
+        with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+            pages[sel] = f.read()
+    listing = pages.pop('0')
+    return listing, pages
+
+
+def record_digest(question_content, answer_content):
+    data = json.dumps([question_content, answer_content], ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def extraction_digests(scraper, pages):
+    digests = {}
+    for sel, content in pages.items():
+        record = scraper.apply_extracted_content({'question': ''}, scraper.extract_page(content))
+        digests[sel] = record_digest(record['question_content'], record['answer_content'])
+    return digests
+
+
+def quiet(func, *args, **kwargs):
+    """Call func with the scraper's progress output silenced"""
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def peak_rss_mb():
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# Stages: each returns (pages processed, seconds, extra info)
+
+def stage_get_main_page(options):
+    scraper = BibelQAScraper(base_url=options['url'])
+    start = time.perf_counter()
+    for _ in range(options['rounds']):
+        quiet(scraper.get_main_page)
+    return options['rounds'], time.perf_counter() - start, ''
+
+
+def stage_extract_question_links(options):
+    listing, _ = load_fixtures()
+    scraper = BibelQAScraper()
+    soup = scraper.parse_listing(listing)
+    rounds = options['rounds'] * 10
+    start = time.perf_counter()
+    for _ in range(rounds):
+        links = scraper.extract_question_links(soup)
+    return rounds, time.perf_counter() - start, f"{len(links)} links"
+
+
+def parsed_fixtures(scraper):
+    _, pages = load_fixtures()
+    soups = []
+    for content in pages.values():
+        soup = scraper.parse_page(content)
+        for unwanted in soup.find_all(['script', 'style', 'nav', 'footer', 'header']):
+            unwanted.decompose()
+        soups.append(soup)
+    return soups
+
+
+def stage_find_main_content_area(options):
+    scraper = BibelQAScraper()
+    soups = parsed_fixtures(scraper)
+    start = time.perf_counter()
+    for _ in range(options['rounds']):
+        for soup in soups:
+            scraper.find_main_content_area(soup)
+    return options['rounds'] * len(soups), time.perf_counter() - start, ''
+
+
+def stage_find_main_content_area_templated(options):
+    with tempfile.TemporaryDirectory() as directory:
+        scraper = BibelQAScraper(template_cache=TemplateCache(os.path.join(directory, 'templates.json')))
+        soups = parsed_fixtures(scraper)
+        # First pass learns the layouts; the timed rounds reuse them
+        for soup in soups:
+            scraper.find_main_content_area(soup)
+        start = time.perf_counter()
+        for _ in range(options['rounds']):
+            for soup in soups:
+                scraper.find_main_content_area(soup)
+        elapsed = time.perf_counter() - start
+    hits = scraper.metrics.counter('template_cache_total', result='hit')
+    return options['rounds'] * len(soups), elapsed, f"{hits:g} template hits"
+
+
+def stage_extract_all_formatted_content(options):
+    scraper = BibelQAScraper()
+    areas = []
+    for soup in parsed_fixtures(scraper):
+        area = scraper.find_main_content_area(soup)
+        areas.append((area, scraper.extract_formatted_question(area)))
+    start = time.perf_counter()
+    for _ in range(options['rounds']):
+        for area, question in areas:
+            scraper.extract_all_formatted_content(area, question)
+    return options['rounds'] * len(areas), time.perf_counter() - start, ''
+
+
+def stage_clean_and_beautify_text(options):
+    scraper = BibelQAScraper()
+    strings = [soup.get_text() for soup in parsed_fixtures(scraper)]
+    strings += [p for s in strings for p in s.split('\n\n')]
+    start = time.perf_counter()
+    for _ in range(options['rounds']):
+        for s in strings:
+            scraper.clean_and_beautify_text(s)
+    return options['rounds'] * len(strings), time.perf_counter() - start, 'strings, not pages'
+
+
+def stage_scrape_all_questions(options):
+    scraper = BibelQAScraper(base_url=options['url'])
+    _, pages = load_fixtures()
+    start = time.perf_counter()
+    results = quiet(scraper.scrape_all_questions, concurrency=options['concurrency'],
+                    rate=1000, burst=options['concurrency'] or 1, workers=options['workers'])
+    elapsed = time.perf_counter() - start
+
+    with open(GOLDEN_FILE, encoding='utf-8') as f:
+        golden = json.load(f)
+    changed = [r['id'] for r in results
+               if golden.get(r['id']) != record_digest(r['question_content'], r['answer_content'])]
+    if len(results) != len(pages) or changed:
+        raise RuntimeError(f"end-to-end output differs from golden for {changed or 'the page count'}")
+    return len(results), elapsed, f"concurrency {options['concurrency']}, golden ok"
+
+
+STAGES = [
+    ('get_main_page', stage_get_main_page, True),
+    ('extract_question_links', stage_extract_question_links, False),
+    ('find_main_content_area', stage_find_main_content_area, False),
+    ('find_main_content_area_templated', stage_find_main_content_area_templated, False),
+    ('extract_all_formatted_content', stage_extract_all_formatted_content, False),
+    ('clean_and_beautify_text', stage_clean_and_beautify_text, False),
+    ('scrape_all_questions', stage_scrape_all_questions, True),
+]
+
+
+def run_stage(stage, options, queue):
+    try:
+        count, seconds, info = stage(options)
+        queue.put((count, seconds, peak_rss_mb(), info))
+    except Exception as e:
+        queue.put(e)
+
+
+def check_golden(update=False):
+    _, pages = load_fixtures()
+    digests = extraction_digests(BibelQAScraper(), pages)
+    if update or not os.path.exists(GOLDEN_FILE):
+        with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+            json.dump(digests, f, indent=2, sort_keys=True)
+        print(f"Golden output written for {len(digests)} pages")
+        return True
+    with open(GOLDEN_FILE, encoding='utf-8') as f:
+        golden = json.load(f)
+    changed = sorted(sel for sel in digests if golden.get(sel) != digests[sel])
+    if changed:
+        print(f"Extracted text differs from golden for sel={', '.join(changed)}")
+        return False
+    # Pages whose content area comes from a learned layout must come out the same
+    with tempfile.TemporaryDirectory() as directory:
+        scraper = BibelQAScraper(template_cache=TemplateCache(os.path.join(directory, 'templates.json')))
+        extraction_digests(scraper, pages)
+        changed = sorted(sel for sel, digest in extraction_digests(scraper, pages).items()
+                         if golden.get(sel) != digest)
+    if changed:
+        print(f"Extracted text with learned layouts differs from golden for sel={', '.join(changed)}")
+        return False
+    print(f"Golden output matches for {len(digests)} pages")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05, help="stand-in server latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="stand-in server 503 rate for get_main_page (end-to-end always runs without)")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--stage', action='append', choices=[name for name, _, _ in STAGES],
+                        help="run only this stage (repeatable)")
+    parser.add_argument('--update-golden', action='store_true')
+    args = parser.parse_args()
+
+    if not check_golden(args.update_golden):
+        sys.exit(1)
+
+    context = multiprocessing.get_context('spawn')
+    print(f"\n{'stage':<32}{'items':>8}{'seconds':>10}{'items/s':>10}{'peak RSS MB':>13}  info")
+    for name, stage, network in STAGES:
+        if args.stage and name not in args.stage:
+            continue
+        error_rate = args.error_rate if name == 'get_main_page' else 0.0
+        with StandInServer(latency=args.latency if network else 0, error_rate=error_rate) as server:
+            options = {'url': server.url, 'rounds': args.rounds,
+                       'concurrency': args.concurrency, 'workers': args.workers}
+            queue = context.Queue()
+            process = context.Process(target=run_stage, args=(stage, options, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+        if isinstance(result, Exception):
+            print(f"{name:<32}failed: {result}")
+            continue
+        count, seconds, rss, info = result
+        print(f"{name:<32}{count:>8}{seconds:>10.3f}{count / seconds:>10.1f}{rss:>13.1f}  {info}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Local stand-in for bibel.se that serves the fixture corpus.
+
+    python scrape/benchmarks/standin_server.py [--port 8000] [--latency 0.2] [--error-rate 0.05]
+
+QandA.php?sel=N returns the fixture page for N (sel=0 is the listing),
+after `latency` seconds, or a 503 with probability `error_rate`. Responses
+carry an ETag and honour If-None-Match.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class StandInServer:
+    """Fixture server running in a background thread; usable as a context manager"""
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR, latency=0.0, error_rate=0.0, port=0, seed=None):
+        with open(os.path.join(fixtures_dir, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.pages = {}
+        for sel, name in manifest.items():
+            with open(os.path.join(fixtures_dir, name), 'rb') as f:
+                self.pages[sel] = f.read()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests += 1
+                if stand_in.latency:
+                    time.sleep(stand_in.latency)
+
+                url = urlparse(self.path)
+                sel = parse_qs(url.query).get('sel', ['0'])[0]
+                body = stand_in.pages.get(sel) if url.path.endswith('QandA.php') else None
+                if body is None:
+                    self.send_error(404)
+                    return
+                if stand_in.error_rate and stand_in.random.random() < stand_in.error_rate:
+                    self.send_error(503)
+                    return
+
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StandInServer(latency=args.latency, error_rate=args.error_rate, port=args.port)
+    print(f"Serving {len(server.pages)} fixture pages at {server.url}/QandA.php")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
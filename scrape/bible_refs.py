@@ -0,0 +1,257 @@
+"""Bible references in Q&A text, and a cross-index to the verse-variant dataset.
+
+    python scrape/bible_refs.py bibel_qa_formatted.json [--out qa_verse_index.json]
+
+References like "Luk. 23:43", "1 Kor 12:4", "Mark. 16:9-20",
+"Joh 7:53-8:11" or "Joh 5:7, 20; 6:1" are normalized to the keys the
+verse-variant app uses ("Luk 23:43", "1 Kor 12:4", ...; ranges keep their
+span: "Mark 16:9-20"). The index maps every referenced verse to the
+questions citing it and every question to its references and to the
+verses of the variant dataset they cover.
+"""
+import argparse
+import json
+import os
+import re
+
+from sqlite_store import search_text
+from writers import write_json
+
+# Variant dataset of the verse-difference app (one "Book chapter:verse" per line)
+VERSE_LIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'vers_diff_vite', 'src',
+                          'data', '1130_verse_SRB_extracted')
+# Highest verse number in any chapter (Ps 119:176); bigger bare numbers
+# after a reference are years, page numbers and the like
+MAX_VERSE = 176
+# Single-chapter ranges longer than this are indexed by their end points only
+MAX_RANGE_VERSES = 200
+
+# Canonical book key -> names and abbreviations used in Swedish text. Keys
+# follow the verse dataset; books listed in NUMBERED_BOOKS need a 1-5 prefix.
+BOOKS = {
+    'Mos': ['Mos', 'Mosebok', 'Moseboken'],
+    'Jos': ['Jos', 'Josua'],
+    'Dom': ['Dom', 'Domarboken'],
+    'Rut': ['Rut', 'Ruts bok'],
+    'Sam': ['Sam', 'Samuelsboken'],
+    'Kung': ['Kung', 'Kon', 'Kungaboken', 'Konungaboken'],
+    'Krön': ['Krön', 'Krönikeboken'],
+    'Esra': ['Esra'],
+    'Neh': ['Neh', 'Nehemja'],
+    'Est': ['Est', 'Ester'],
+    'Job': ['Job', 'Jobs bok'],
+    'Ps': ['Ps', 'Psalm', 'Psaltaren'],
+    'Ords': ['Ords', 'Ordspr', 'Ordspråksboken'],
+    'Pred': ['Pred', 'Predikaren'],
+    'Höga V': ['Höga V', 'HV', 'Höga visan', 'Höga Visan'],
+    'Jes': ['Jes', 'Jesaja'],
+    'Jer': ['Jer', 'Jeremia'],
+    'Klag': ['Klag', 'Klagovisorna'],
+    'Hes': ['Hes', 'Hesekiel'],
+    'Dan': ['Dan', 'Daniel'],
+    'Hos': ['Hos', 'Hosea'],
+    'Joel': ['Joel'],
+    'Amos': ['Am', 'Amos'],
+    'Ob': ['Ob', 'Obadja'],
+    'Jona': ['Jon', 'Jona'],
+    'Mika': ['Mik', 'Mika'],
+    'Nah': ['Nah', 'Nahum'],
+    'Hab': ['Hab', 'Habackuk'],
+    'Sef': ['Sef', 'Sefanja'],
+    'Hagg': ['Hag', 'Hagg', 'Haggai'],
+    'Sak': ['Sak', 'Sakarja'],
+    'Mal': ['Mal', 'Malaki'],
+    'Matt': ['Matt', 'Mt', 'Matteus', 'Matteusevangeliet'],
+    'Mark': ['Mark', 'Mk', 'Markus', 'Markusevangeliet'],
+    'Luk': ['Luk', 'Lk', 'Lukas', 'Lukasevangeliet'],
+    'Joh': ['Joh', 'Johannes', 'Johannesevangeliet', 'Johannesbrevet'],
+    'Apg': ['Apg', 'Apostlagärningarna'],
+    'Rom': ['Rom', 'Romarbrevet'],
+    'Kor': ['Kor', 'Korinthierbrevet', 'Korintierbrevet'],
+    'Gal': ['Gal', 'Galaterbrevet'],
+    'Ef': ['Ef', 'Efesierbrevet'],
+    'Fil': ['Fil', 'Filipperbrevet'],
+    'Kol': ['Kol', 'Kolosserbrevet'],
+    'Thess': ['Thess', 'Tess', 'Thessalonikerbrevet', 'Tessalonikerbrevet'],
+    'Tim': ['Tim', 'Timoteusbrevet', 'Timotheosbrevet'],
+    'Titus': ['Tit', 'Titus', 'Titusbrevet'],
+    'Filem': ['Filem', 'Filemon', 'Filemonbrevet'],
+    'Hebr': ['Hebr', 'Heb', 'Hebreerbrevet'],
+    'Jak': ['Jak', 'Jakobsbrevet'],
+    'Petr': ['Petr', 'Pet', 'Petrusbrevet'],
+    'Jud': ['Jud', 'Judas', 'Judasbrevet'],
+    'Upp': ['Upp', 'Uppb', 'Uppenbarelseboken'],
+}
+# Allowed number prefixes; 'Joh' with a prefix means the letters
+NUMBERED_BOOKS = {'Mos': 5, 'Sam': 2, 'Kung': 2, 'Krön': 2, 'Kor': 2, 'Thess': 2, 'Tim': 2, 'Petr': 2, 'Joh': 3}
+
+BOOK_NAMES = {name: key for key, names in BOOKS.items() for name in names}
+BOOK_ALTERNATIVES = '|'.join(sorted(map(re.escape, BOOK_NAMES), key=len, reverse=True))
+DASH = r'\s*[-–—─]\s*'
+VERSE_ITEM = rf'\d+(?:\s*:\s*\d+)?(?:{DASH}\d+(?:\s*:\s*\d+)?)?(?:\s*ff?\b\.?)?'
+# Book, then "chapter:verse" with optional range and "f"/"ff", then more
+# items after , or ; as long as the number isn't the prefix of another book
+REFERENCE_RE = re.compile(
+    rf'(?<!\w)(?:(?P<number>[1-5])\s*\.?\s*)?(?P<book>{BOOK_ALTERNATIVES})\b\.?\s*'
+    rf'(?P<items>\d+\s*:\s*\d+(?:{DASH}\d+(?:\s*:\s*\d+)?)?(?:\s*ff?\b\.?)?'
+    rf'(?:\s*[,;]\s*{VERSE_ITEM}(?!\w)(?!\s*\.?\s*(?:{BOOK_ALTERNATIVES})\b))*)'
+)
+ITEM_RE = re.compile(rf'(?P<sep>^|[,;])\s*(?P<c1>\d+)(?:\s*:\s*(?P<v1>\d+))?'
+                     rf'(?:{DASH}(?P<c2>\d+)(?:\s*:\s*(?P<v2>\d+))?)?(?:\s*(?P<f>ff?)\b\.?)?')
+
+
+def book_key(number, name):
+    """Canonical book key ("1 Kor", "Matt"), or None for an unusable number/book pair"""
+    key = BOOK_NAMES[name]
+    limit = NUMBERED_BOOKS.get(key)
+    if number:
+        if not limit or int(number) > limit:
+            return None
+        return f"{number} {key}"
+    if limit and key != 'Joh':
+        # "Kor 12:4": no way to tell which letter
+        return None
+    return key
+
+
+def parse_items(items):
+    """(start chapter, start verse, end chapter, end verse) spans of a reference list"""
+    spans = []
+    chapter = None
+    for m in ITEM_RE.finditer(items):
+        c1, v1, c2, v2 = m['c1'], m['v1'], m['c2'], m['v2']
+        if v1 is None:
+            # A bare verse ("5:7, 20") continues the previous chapter
+            if chapter is None or m['sep'] == ';' or int(c1) > MAX_VERSE:
+                continue
+            start = (chapter, int(c1))
+            end = (chapter, int(c2)) if c2 and v2 is None else start
+        else:
+            chapter = int(c1)
+            start = (chapter, int(v1))
+            if c2 and v2:
+                chapter = int(c2)
+                end = (chapter, int(v2))
+            elif c2:
+                end = (chapter, int(c2))
+            else:
+                end = start
+        if m['f'] == 'f' and end == start:
+            end = (start[0], start[1] + 1)
+        if end >= start:
+            spans.append(start + end)
+    return spans
+
+
+def format_reference(book, span):
+    c1, v1, c2, v2 = span
+    if (c1, v1) == (c2, v2):
+        return f"{book} {c1}:{v1}"
+    if c1 == c2:
+        return f"{book} {c1}:{v1}-{v2}"
+    return f"{book} {c1}:{v1}-{c2}:{v2}"
+
+
+def extract_references(text):
+    """Canonical references in text, without repeats, in order of appearance"""
+    references = []
+    for m in REFERENCE_RE.finditer(search_text(text)):
+        book = book_key(m['number'], m['book'])
+        if book is None:
+            continue
+        for span in parse_items(m['items']):
+            reference = format_reference(book, span)
+            if reference not in references:
+                references.append(reference)
+    return references
+
+
+REFERENCE_KEY_RE = re.compile(r'^(?P<book>.+?) (?P<c1>\d+):(?P<v1>\d+)(?:-(?:(?P<c2>\d+):)?(?P<v2>\d+))?$')
+
+
+def reference_verses(reference, known_verses=()):
+    """Verse keys a canonical reference covers
+
+    Single-chapter ranges are expanded verse by verse (up to
+    MAX_RANGE_VERSES); for ranges across chapters, whose chapter lengths
+    aren't known here, the end points and any known_verses inside are used.
+    """
+    m = REFERENCE_KEY_RE.match(reference)
+    book, c1, v1 = m['book'], int(m['c1']), int(m['v1'])
+    c2 = int(m['c2']) if m['c2'] else c1
+    v2 = int(m['v2']) if m['v2'] else v1
+    if c1 == c2 and v2 - v1 < MAX_RANGE_VERSES:
+        return [f"{book} {c1}:{v}" for v in range(v1, v2 + 1)]
+    verses = [f"{book} {c1}:{v1}"]
+    for key in known_verses:
+        k = REFERENCE_KEY_RE.match(key)
+        if k and not k['v2'] and k['book'] == book and \
+                (c1, v1) < (int(k['c1']), int(k['v1'])) < (c2, v2):
+            verses.append(key)
+    verses.append(f"{book} {c2}:{v2}")
+    return verses
+
+
+def load_verse_list(path=VERSE_LIST):
+    """Verse keys of the variant dataset ([] if the file isn't there)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def build_verse_index(records, variant_verses=()):
+    """Bidirectional index between questions and the verses they reference"""
+    variant_set = set(variant_verses)
+    verse_to_questions = {}
+    question_to_references = {}
+    question_to_variants = {}
+    for record in records:
+        if record.get('error'):
+            continue
+        references = record.get('references')
+        if references is None:
+            references = extract_references(f"{record.get('question_content', '')}\n{record.get('answer_content', '')}")
+        if not references:
+            continue
+        question_to_references[record['id']] = references
+        covered = []
+        for reference in references:
+            for verse in reference_verses(reference, variant_verses):
+                ids = verse_to_questions.setdefault(verse, [])
+                if record['id'] not in ids:
+                    ids.append(record['id'])
+                if verse in variant_set and verse not in covered:
+                    covered.append(verse)
+        if covered:
+            question_to_variants[record['id']] = covered
+    return {
+        'verse_to_questions': verse_to_questions,
+        'question_to_references': question_to_references,
+        'question_to_variants': question_to_variants,
+    }
+
+
+def write_verse_index(records, filename, verse_list=VERSE_LIST):
+    """Build the index against the variant dataset and write it as compact JSON"""
+    index = build_verse_index(records, load_verse_list(verse_list))
+    write_json(index, filename, indent=None)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-index Bible references in the Q&A to the verse dataset")
+    parser.add_argument('input', help="JSON output of the scraper (a list of records)")
+    parser.add_argument('--out', default='qa_verse_index.json', help="index file to write")
+    parser.add_argument('--verses', default=VERSE_LIST, help="verse list of the variant dataset")
+    args = parser.parse_args(argv)
+
+    with open(args.input, encoding='utf-8') as f:
+        index = write_verse_index(json.load(f), args.out, args.verses)
+    print(f"{len(index['question_to_references'])} questions reference {len(index['verse_to_questions'])} verses "
+          f"({sum(map(len, index['question_to_variants'].values()))} links to the variant dataset); "
+          f"index written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from jsonl_sink import JsonlSink, read_jsonl
+from writers import write_text
+
+# Query parameters that say where a link was clicked, not which page it is
+IGNORED_PARAMS = {'origin'}
+# Parameters that identify a Q&A page, in the order canonical URLs list them
+KEY_PARAMS = ('sel', 'qtype')
+
+
+def canonical_url(url):
+    """URL a page is known by: no fragment or tracking parameters, sel and qtype first
+
+    "https://bibel.se/QandA.php?qtype=other&sel=12&origin=homepage#anchor-name"
+    -> "https://bibel.se/QandA.php?sel=12&qtype=other". Other parameters
+    (e.g. a listing's page number) are kept, sorted, after them.
+    """
+    parts = urlsplit(url)
+    params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS]
+    order = {k: i for i, k in enumerate(KEY_PARAMS)}
+    params.sort(key=lambda kv: (order.get(kv[0], len(KEY_PARAMS)), kv))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', urlencode(params), ''))
+
+
+def _digest(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def url_digest(url):
+    """64-bit hash of a URL's canonical form, as kept in the seen-set for listing pages"""
+    return _digest(canonical_url(url))
+
+
+def question_digest(link):
+    """64-bit hash of a question link's ID, as kept in the seen-set for questions
+
+    Records are keyed on the ID (sel) alone everywhere (sync snapshots,
+    --resume, the database), so a question listed under two qtypes is one
+    question.
+    """
+    return _digest('question:' + link['id'])
+
+
+class CrawlFrontier:
+    """Resumable breadth-first crawl state kept in a directory
+
+    queue.jsonl holds the listing and pagination pages to fetch, in the
+    order they were found; `cursor` holds the byte offset of the next one,
+    and only moves on once a page is done(). links.jsonl holds the question
+    links found. These two files are the crawl's record of what it has
+    seen: on opening, the seen-set (an 8-byte digest of the canonical URL
+    of every page queued and of the ID of every question found) is rebuilt
+    from them, so a crawl
+    resumed after a crash never queues or lists anything twice. An exact
+    hashed set rather than a Bloom filter: a false positive there would
+    silently drop a question.
+    """
+
+    def __init__(self, directory='crawl_state'):
+        self.directory = directory
+        self.queue_path = os.path.join(directory, 'queue.jsonl')
+        self.links_path = os.path.join(directory, 'links.jsonl')
+        self.cursor_path = os.path.join(directory, 'cursor')
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        # Opening the sinks first cuts off a line left half-written by a crash
+        self.queue = JsonlSink(self.queue_path)
+        self.links = JsonlSink(self.links_path)
+        self.seen = {url_digest(page['url']) for page in read_jsonl(self.queue_path)}
+        self.seen.update(question_digest(link) for link in read_jsonl(self.links_path))
+        self.cursor = 0
+        if os.path.exists(self.cursor_path):
+            with open(self.cursor_path, encoding='utf-8') as f:
+                self.cursor = int(f.read().strip() or 0)
+        self.next_end = None
+
+    def close(self):
+        self.queue.close()
+        self.links.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def reset(self):
+        """Forget the previous crawl"""
+        self.close()
+        for path in (self.queue_path, self.links_path, self.cursor_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._open()
+
+    def add_listing(self, url, depth=0):
+        """Queue a listing or pagination page unless it was seen before; returns whether it was queued"""
+        digest = url_digest(url)
+        if digest in self.seen:
+            return False
+        self.queue.write({'url': url, 'depth': depth})
+        self.seen.add(digest)
+        return True
+
+    def add_question(self, link):
+        """Record a question link unless its ID was seen before; returns whether it was new"""
+        digest = question_digest(link)
+        if digest in self.seen:
+            return False
+        self.links.write(link)
+        self.seen.add(digest)
+        return True
+
+    def next(self):
+        """Next queued page ({'url', 'depth'}), or None when the crawl is complete"""
+        self.queue.file.flush()
+        with open(self.queue_path, 'rb') as f:
+            f.seek(self.cursor)
+            line = f.readline()
+        if not line.endswith(b'\n'):
+            return None
+        self.next_end = self.cursor + len(line)
+        return json.loads(line)
+
+    def done(self):
+        """Mark the page returned by next() as crawled"""
+        self.queue.sync()
+        self.links.sync()
+        self.cursor = self.next_end
+        write_text(self.cursor_path, str(self.cursor))
+
+    def pending(self):
+        """Whether an unfinished crawl is waiting to be resumed"""
+        return self.next() is not None
+
+    def question_links(self):
+        """Question links found, in discovery order"""
+        self.links.file.flush()
+        return list(read_jsonl(self.links_path))
+
+    def summary(self):
+        return f"Crawl state in {self.directory}: {len(self.seen)} URLs seen, cursor at byte {self.cursor}"
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+def normalize_url(url):
+    """Canonical form of a URL: no fragment, lowercase scheme/host, sorted query"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+
+class ResponseCache:
+    """On-disk cache of response bodies and their validators, keyed by normalized URL
+
+    Each entry is a pair of files: <key>.body with the raw body and
+    <key>.json with the URL, ETag, Last-Modified, fetch time and how long the
+    full download took. Entries younger than max_age seconds are served
+    without a request; older ones are revalidated with If-None-Match /
+    If-Modified-Since.
+    """
+
+    def __init__(self, directory='http_cache', max_age=0):
+        self.directory = directory
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.stats = {
+            'downloads': 0,
+            'revalidated': 0,
+            'fresh': 0,
+            'bytes_downloaded': 0,
+            'bytes_saved': 0,
+            'seconds_saved': 0.0,
+        }
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url, suffix):
+        key = hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + suffix)
+
+    def lookup(self, url):
+        """Cached entry for url (metadata plus 'body'), or None"""
+        try:
+            with open(self._path(url, '.json'), encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(self._path(url, '.body'), 'rb') as f:
+                entry['body'] = f.read()
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return self.max_age > 0 and time.time() - entry['fetched_at'] < self.max_age
+
+    def fresh(self, url):
+        """Whether url can be served without a request (reads only the metadata)"""
+        if self.max_age <= 0:
+            return False
+        try:
+            with open(self._path(url, '.json'), encoding='utf-8') as f:
+                return self.is_fresh(json.load(f))
+        except (OSError, ValueError):
+            return False
+
+    def conditional_headers(self, entry):
+        """Request headers that let the server answer 304 Not Modified"""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, response, elapsed):
+        """Save a full 200 response"""
+        entry = {
+            'url': normalize_url(url),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'elapsed': elapsed,
+            'size': len(response.content),
+        }
+        self._write(self._path(url, '.body'), response.content)
+        self._write(self._path(url, '.json'), json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+        with self.lock:
+            self.stats['downloads'] += 1
+            self.stats['bytes_downloaded'] += entry['size']
+
+    def record_hit(self, url, entry, elapsed=0.0):
+        """Count a 304 (elapsed = its round trip) or a fresh hit served without a request"""
+        if elapsed:
+            # Keep the validators, but restart the freshness clock
+            meta = {k: v for k, v in entry.items() if k != 'body'}
+            meta['fetched_at'] = time.time()
+            self._write(self._path(url, '.json'), json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+        with self.lock:
+            self.stats['revalidated' if elapsed else 'fresh'] += 1
+            self.stats['bytes_saved'] += entry['size']
+            self.stats['seconds_saved'] += max(0.0, entry.get('elapsed', 0.0) - elapsed)
+
+    def _write(self, path, data):
+        # Write to a temporary file first so a crash never leaves half an entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        s = self.stats
+        return (f"Cache: {s['downloads']} downloaded ({s['bytes_downloaded']} bytes), "
+                f"{s['revalidated']} not modified, {s['fresh']} served without request; "
+                f"saved {s['bytes_saved']} bytes and ~{s['seconds_saved']:.1f}s")
@@ -0,0 +1,130 @@
+import json
+import os
+import re
+
+
+class JsonlSink:
+    """Append-only JSON Lines writer, one record per line
+
+    Records are flushed to the OS as they are written and fsynced every
+    fsync_every records, so a crash loses at most that many. A partial last
+    line left by an earlier crash is cut off before appending.
+    """
+
+    def __init__(self, path, append=True, fsync_every=10):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.pending = 0
+        if append:
+            self._truncate_partial_line()
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def _truncate_partial_line(self):
+        try:
+            with open(self.path, 'rb+') as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                if size == 0:
+                    return
+                # Scan back to the last complete line
+                end = size
+                while end > 0:
+                    step = min(4096, end)
+                    f.seek(end - step)
+                    chunk = f.read(step)
+                    newline = chunk.rfind(b'\n')
+                    if newline != -1:
+                        end = end - step + newline + 1
+                        break
+                    end -= step
+                if end != size:
+                    f.truncate(end)
+        except FileNotFoundError:
+            pass
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.pending += 1
+        if self.pending >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_jsonl(path):
+    """Yield the records of a JSONL file, skipping lines that don't parse"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A line cut short by a crash
+                continue
+
+
+# JsonlSink writes records with json.dumps() defaults, and question records start with their ID
+ID_PREFIX_RE = re.compile(rb'\{"id": "((?:[^"\\]|\\.)*)"')
+
+
+def last_record_lines(path):
+    """Byte offsets of the lines holding the last record for each ID, in file order
+
+    The ID is read from the start of the line, so records are not parsed;
+    lines that don't start that way (or the crash-cut last line) are parsed
+    to check them.
+    """
+    last = {}
+    offset = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            m = ID_PREFIX_RE.match(line)
+            if m and line.endswith(b'\n'):
+                qid = json.loads(b'"' + m.group(1) + b'"')
+            else:
+                try:
+                    qid = json.loads(line)['id']
+                except (ValueError, KeyError, TypeError):
+                    qid = None
+            if qid is not None:
+                last[qid] = offset
+            offset += len(line)
+    return sorted(last.values())
+
+
+def read_jsonl_lines(path, offsets):
+    """Yield the records on the lines starting at the given byte offsets"""
+    with open(path, 'rb') as f:
+        for offset in offsets:
+            f.seek(offset)
+            yield json.loads(f.readline())
+
+
+def completed_ids(path):
+    """IDs of records in a JSONL file that need no new attempt
+    
+    That is records extracted without error, and those whose fetch failed
+    permanently (e.g. 404). Transient fetch failures and extraction errors
+    (error_kind 'extraction') are left to be tried again.
+    """
+    if not os.path.exists(path):
+        return set()
+    return {record['id'] for record in read_jsonl(path)
+            if not record.get('error') or record.get('error_kind') == 'permanent'}
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+def _quantile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Metrics:
+    """Thread-safe counters and timing samples collected during a run
+
+    Counters count events (requests by status, fallback paths taken);
+    samples keep every observed value (latencies, sizes) so the summary can
+    report percentiles. Metrics from worker processes are combined with
+    merge().
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.samples = defaultdict(list)
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[_key(name, labels)] += value
+
+    def observe(self, name, value, **labels):
+        with self.lock:
+            self.samples[_key(name, labels)].append(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter(self, name, **labels):
+        return self.counters.get(_key(name, labels), 0)
+
+    def total(self, name):
+        """Sum of a counter over all label values"""
+        return sum(v for (n, _), v in self.counters.items() if n == name)
+
+    def export(self):
+        """Picklable snapshot, e.g. to send back from a worker process"""
+        with self.lock:
+            return dict(self.counters), {k: list(v) for k, v in self.samples.items()}
+
+    def merge(self, snapshot):
+        counters, samples = snapshot
+        with self.lock:
+            for key, value in counters.items():
+                self.counters[key] += value
+            for key, values in samples.items():
+                self.samples[key].extend(values)
+
+    def summary(self):
+        """Human-readable report of every metric"""
+        lines = ["=== Metrics ==="]
+        with self.lock:
+            for (name, labels), values in sorted(self.samples.items()):
+                lines.append(
+                    f"{name}{_label_text(labels)}: n={len(values)} "
+                    f"mean={sum(values) / len(values):.4g} p50={_quantile(values, 0.5):.4g} "
+                    f"p95={_quantile(values, 0.95):.4g} max={max(values):.4g}"
+                )
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{name}{_label_text(labels)}: {value:g}")
+        return '\n'.join(lines)
+
+    def write_prometheus(self, filename):
+        """Write all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            counter_names = sorted({name for name, _ in self.counters})
+            for name in counter_names:
+                lines.append(f"# TYPE {name} counter")
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{name}{_label_text(labels)} {value:g}")
+            sample_names = sorted({name for name, _ in self.samples})
+            for name in sample_names:
+                lines.append(f"# TYPE {name} summary")
+                for (n, labels), values in sorted(self.samples.items()):
+                    if n != name:
+                        continue
+                    for q in (0.5, 0.9, 0.99):
+                        lines.append(f"{name}{_label_text(labels, [('quantile', q)])} {_quantile(values, q):.6g}")
+                    lines.append(f"{name}_sum{_label_text(labels)} {sum(values):.6g}")
+                    lines.append(f"{name}_count{_label_text(labels)} {len(values)}")
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
@@ -0,0 +1,158 @@
+import gzip
+import json
+import os
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http.client import responses as HTTP_REASONS
+
+from http_cache import normalize_url
+
+# Headers describing the transfer rather than the stored (decoded) body
+TRANSFER_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+class PageArchive:
+    """Append-only, WARC-style archive of raw HTTP responses
+
+    Every response is stored as a WARC/1.0 "response" record (URL, date,
+    status line, headers and body) in its own gzip member, so a record can
+    be decompressed on its own. A sidecar index (<path>.idx, one JSON line
+    per record) maps each normalized URL to the offset and length of its
+    latest record; it is rebuilt from the archive if missing or behind.
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path or path + '.idx'
+        self.lock = threading.Lock()
+        self.index = {}
+        self._load_index()
+
+    def _load_index(self):
+        archive_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        indexed_end = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.index[entry['url']] = (entry['offset'], entry['length'])
+                    indexed_end = max(indexed_end, entry['offset'] + entry['length'])
+        if indexed_end != archive_size:
+            self.rebuild_index()
+
+    def rebuild_index(self):
+        """Recreate the index by scanning every gzip member of the archive"""
+        self.index = {}
+        entries = []
+        if os.path.exists(self.path):
+            offset = 0
+            with open(self.path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                while offset < size:
+                    f.seek(offset)
+                    length, record = self._read_member(f)
+                    if record is None:
+                        # A member cut short by a crash: drop it
+                        break
+                    url = self._parse(record)['url']
+                    entries.append({'url': url, 'offset': offset, 'length': length})
+                    self.index[url] = (offset, length)
+                    offset += length
+            if offset < size:
+                with open(self.path, 'rb+') as f:
+                    f.truncate(offset)
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + '\n')
+
+    def _read_member(self, f, chunk_size=65536):
+        """Decompress the gzip member at the file position: (compressed length, data)"""
+        decompressor = zlib.decompressobj(wbits=31)
+        parts = []
+        consumed = 0
+        try:
+            while not decompressor.eof:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return consumed, None
+                parts.append(decompressor.decompress(chunk))
+                consumed += len(chunk)
+        except zlib.error:
+            return consumed, None
+        return consumed - len(decompressor.unused_data), b''.join(parts)
+
+    def write(self, url, status, headers, body):
+        """Append a response record for url"""
+        url = normalize_url(url)
+        http_head = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}".rstrip()]
+        for name, value in headers.items():
+            if name.lower() not in TRANSFER_HEADERS:
+                http_head.append(f"{name}: {value}")
+        http_head.append(f"Content-Length: {len(body)}")
+        block = ('\r\n'.join(http_head) + '\r\n\r\n').encode('utf-8') + body
+
+        warc_head = '\r\n'.join([
+            'WARC/1.0',
+            'WARC-Type: response',
+            f'WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>',
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+            f'WARC-Target-URI: {url}',
+            'Content-Type: application/http; msgtype=response',
+            f'Content-Length: {len(block)}',
+        ]) + '\r\n\r\n'
+        member = gzip.compress(warc_head.encode('utf-8') + block + b'\r\n\r\n')
+
+        with self.lock:
+            with open(self.path, 'ab') as f:
+                offset = f.tell()
+                f.write(member)
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'url': url, 'offset': offset, 'length': len(member)}) + '\n')
+            self.index[url] = (offset, len(member))
+
+    def __contains__(self, url):
+        return normalize_url(url) in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def read(self, url):
+        """Latest record for url as a dict (url, date, status, headers, body), or None"""
+        location = self.index.get(normalize_url(url))
+        if location is None:
+            return None
+        offset, length = location
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return self._parse(gzip.decompress(f.read(length)))
+
+    def records(self):
+        """Latest record of every archived URL, in archive order"""
+        for url, _ in sorted(self.index.items(), key=lambda item: item[1][0]):
+            yield self.read(url)
+
+    def _parse(self, record):
+        warc_head, _, rest = record.partition(b'\r\n\r\n')
+        warc_fields = self._header_fields(warc_head.decode('utf-8').split('\r\n')[1:])
+        block = rest[:int(warc_fields['content-length'])]
+        http_head, _, body = block.partition(b'\r\n\r\n')
+        http_lines = http_head.decode('utf-8').split('\r\n')
+        return {
+            'url': warc_fields['warc-target-uri'],
+            'date': warc_fields.get('warc-date'),
+            'status': int(http_lines[0].split()[1]),
+            'headers': self._header_fields(http_lines[1:], lower=False),
+            'body': body,
+        }
+
+    def _header_fields(self, lines, lower=True):
+        fields = {}
+        for line in lines:
+            name, _, value = line.partition(':')
+            fields[name.strip().lower() if lower else name.strip()] = value.strip()
+        return fields
@@ -0,0 +1,141 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# Statuses that mean "try again later" rather than "this page is broken"
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def is_transient(error):
+    """Whether a fetch error is worth retrying (timeouts, dropped connections, 429/5xx)"""
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in TRANSIENT_STATUSES
+    return False
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RequestController:
+    """Adaptive concurrency limit and retry policy shared by all requests of a run
+
+    The limit on requests in flight grows additively (about +1 per `limit`
+    healthy responses) while latency stays under latency_target, and is
+    halved on 429/5xx responses and timeouts. A Retry-After header pauses
+    every request until it has passed. Transient failures are retried with
+    jittered exponential backoff, up to max_attempts per request and
+    retry_budget retries per run.
+    """
+
+    def __init__(self, max_concurrency=8, min_concurrency=1, initial_concurrency=2,
+                 latency_target=2.0, max_attempts=4, base_delay=1.0, max_delay=60.0,
+                 retry_budget=100):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(min(max(initial_concurrency, min_concurrency), max_concurrency))
+        self.latency_target = latency_target
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self.retries = 0
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the `limit` request slots, waiting out any Retry-After pause"""
+        with self.condition:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self.condition.wait(timeout=wait if wait > 0 else None)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    def record(self, response=None, error=None, latency=0.0):
+        """Adjust the limit after a request; returns 'ok', 'transient' or 'permanent'"""
+        if error is not None:
+            outcome = 'transient' if is_transient(error) else 'permanent'
+            if isinstance(error, requests.Timeout):
+                self._decrease()
+            return outcome
+
+        if response.status_code in TRANSIENT_STATUSES:
+            self._decrease(self._retry_after(response))
+            return 'transient'
+
+        if latency <= self.latency_target:
+            self._increase()
+        return 'ok'
+
+    def _retry_after(self, response):
+        """The response's Retry-After in seconds, capped at max_delay (None if absent)
+
+        One "Retry-After: 86400" would otherwise hold every request of the run for a day.
+        """
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        return None if retry_after is None else min(self.max_delay, retry_after)
+
+    def _increase(self):
+        with self.condition:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+    def _decrease(self, retry_after=None):
+        with self.condition:
+            self.limit = max(self.min_concurrency, self.limit / 2)
+            if retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    def retry_delay(self, attempt, response=None):
+        """Seconds to wait before retry number `attempt` (0-based), or None to give up"""
+        with self.condition:
+            if attempt + 1 >= self.max_attempts or self.retries >= self.retry_budget:
+                return None
+            self.retries += 1
+        retry_after = self._retry_after(response) if response is not None else None
+        if retry_after is not None:
+            return retry_after
+        # Full jitter: anywhere up to the exponential cap, so retries don't bunch up
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def pacing_delay(self, interval=2.0):
+        """Pause between sequential requests: `interval`, or longer while a Retry-After pause lasts
+
+        Sequential mode keeps its fixed politeness delay whatever the limit;
+        the limit only paces concurrent requests.
+        """
+        return max(interval, self.paused_until - time.monotonic())
+
+    def summary(self):
+        return (f"Requests: concurrency limit {self.limit:.1f}/{self.max_concurrency}, "
+                f"{self.retries} retries used of {self.retry_budget}")
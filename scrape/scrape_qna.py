@@ -1,13 +1,96 @@
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, CData, NavigableString, SoupStrainer, Tag, UnicodeDammit
+import argparse
+import asyncio
+import cProfile
+import pstats
 import json
+import sys
 import time
 import re
-from urllib.parse import urljoin, parse_qs, urlparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urldefrag, urljoin, parse_qs, urlparse
 import html
 
+from bible_refs import extract_references, write_verse_index
+from frontier import CrawlFrontier
+from http_cache import ResponseCache
+from jsonl_sink import JsonlSink, completed_ids, last_record_lines, read_jsonl_lines
+from metrics import Metrics
+from page_archive import PageArchive
+from rate_limit import HostRateLimiter
+from request_controller import RequestController, is_transient
+from search_index import build_search_index
+from sqlite_store import QAStore
+from sync import sync_questions
+from template_cache import TemplateCache, fingerprint, resolve_path
+from writers import TeeSink
+
+CONTENT_CLASS_RE = re.compile(r'content|main|body|newspaper')
+# Text a content-area candidate must exceed, per search strategy
+CONTENT_AREA_MIN_TEXT = {'table': 300, 'div': 100, 'container': 300}
+HEADER_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+SECTION_TAGS = {'p', 'div', 'span', 'b', 'strong', 'i', 'em', 'br', 'hr', 'ul', 'ol', 'li', 'blockquote', 'td'}
+INLINE_TAGS = {'span', 'b', 'strong', 'i', 'em'}
+# String types included in get_text()
+TEXT_STRING_TYPES = (NavigableString, CData)
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+# UTF-8 text that was decoded as cp1252, grouped by the prefix every
+# sequence in the group starts with
+ENCODING_FIXES = {
+    'â€': [
+        ('â€‹', ''),      # Zero-width space
+        ('â€"', '–'),     # En dash
+        ('â€™', "'"),     # Right single quotation
+        ('â€œ', '"'),     # Left double quotation
+        ('â€', '"'),      # Right double quotation
+    ],
+    'Ã': [
+        ('Ã¥', 'å'),      # Swedish å
+        ('Ã¤', 'ä'),      # Swedish ä
+        ('Ã¶', 'ö'),      # Swedish ö
+        ('Ã…', 'Å'),      # Swedish Å
+        ('Ã„', 'Ä'),      # Swedish Ä
+        ('Ã–', 'Ö'),      # Swedish Ö
+    ],
+}
+# The listing page is only read for its question links
+QUESTION_LINK_STRAINER = SoupStrainer('a', href=lambda href: href and 'QandA.php' in href)
+# End of the head directly followed by the body tag: everything extraction
+# looks at comes after it
+BODY_START_RE = re.compile(r'</head\s*>\s*(?:<!--.*?-->\s*)*(<body[\s>/])', re.I | re.S)
+SPACE_RUN_RE = re.compile(r'[ \t]{2,}|\t')
+LINE_BREAK_RUN_RE = re.compile(r'\n\s*\n\s*\n+')
+
+class SectionFrame:
+    """A tag being summarized by stream_formatted_sections()
+    
+    units are its children still to visit (see _child_units()); the parts
+    lists collect what preserve_formatting() would build from them, and
+    child_values each child's string or .string (to find the tag's own).
+    """
+    __slots__ = ('tag', 'units', 'next_unit', 'order', 'in_block', 'in_pre',
+                 'inner_parts', 'text_parts', 'own_parts', 'child_values')
+    
+    def __init__(self, tag, units, order, in_block, in_pre):
+        self.tag = tag
+        self.units = units
+        self.next_unit = 0
+        # Preorder index, which puts the sections back in document order
+        self.order = order
+        # Whether a p/div ancestor makes inline tags no sections of their own
+        self.in_block = in_block
+        # Whether whitespace is preserved (inside pre/textarea)
+        self.in_pre = in_pre
+        self.inner_parts = []
+        self.text_parts = []
+        self.own_parts = []
+        self.child_values = []
+
 class BibelQAScraper:
-    def __init__(self):
+    def __init__(self, cache=None, parser='html.parser', archive=None, replay=None,
+                 base_url="https://bibel.se", controller=None, template_cache=None, frontier=None):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -16,20 +99,152 @@ class BibelQAScraper:
             'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive',
         })
-        self.base_url = "https://bibel.se"
+        self.base_url = base_url
+        self.main_url = f"{base_url}/QandA.php?sel=0&qtype=other&origin=homepage"
+        self.timeout = 15
+        # Optional ResponseCache for conditional re-fetching
+        self.cache = cache
+        # BeautifulSoup backend: 'html.parser' or 'lxml'
+        self.parser = parser
+        # Optional PageArchive every raw response is written to
+        self.archive = archive
+        # Optional PageArchive to read pages from instead of the network
+        self.replay = replay
+        # Adaptive concurrency limit and retry policy for network requests
+        self.controller = controller or RequestController()
+        # Optional TemplateCache of content-area locations per page layout
+        self.template_cache = template_cache
+        # Optional CrawlFrontier: discover questions on every listing page, not just the homepage
+        self.frontier = frontier
+        # Request, parse and extraction measurements for the run
+        self.metrics = Metrics()
+        # Question ID whose extraction is run under a profiler
+        self.profile_page = None
+        
+    def fetch(self, url):
+        """Fetch a URL and return the raw response body"""
+        if self.replay is not None:
+            record = self.replay.read(url)
+            if record is None:
+                self.metrics.inc('fetch_errors_total', kind='not_archived')
+                raise LookupError(f"{url} is not in the archive")
+            self.metrics.inc('archive_reads_total')
+            return record['body']
+        
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            self.cache.record_hit(url, entry)
+            self.metrics.inc('cache_hits_total', kind='fresh')
+            self.archive_cached(url, entry)
+            return entry['body']
+        
+        headers = self.cache.conditional_headers(entry) if entry else None
+        response, elapsed = self.request(url, headers)
+        
+        # Unchanged since the cached copy: no body was sent
+        if entry and response.status_code == 304:
+            self.cache.record_hit(url, entry, elapsed)
+            self.metrics.inc('cache_hits_total', kind='not_modified')
+            self.archive_cached(url, entry)
+            return entry['body']
         
-    def get_main_page(self, url="https://bibel.se/QandA.php?sel=0&qtype=other&origin=homepage"):
+        try:
+            response.raise_for_status()
+        except Exception as e:
+            self.metrics.inc('fetch_errors_total', kind=self.classify_error(e))
+            raise
+        if self.cache:
+            self.cache.store(url, response, elapsed)
+        if self.archive is not None:
+            self.archive.write(url, response.status_code, response.headers, response.content)
+        return response.content
+    
+    def request(self, url, headers=None):
+        """GET url under the request controller, retrying transient failures
+        
+        Returns the final response and how long its attempt took. Errors that
+        are still failing when retries run out are raised; a final 429/5xx
+        response is returned for fetch() to raise.
+        """
+        attempt = 0
+        while True:
+            with self.controller.slot():
+                start = time.monotonic()
+                try:
+                    response = self.session.get(url, timeout=self.timeout, headers=headers)
+                    error = None
+                except requests.RequestException as e:
+                    response, error = None, e
+                elapsed = time.monotonic() - start
+            outcome = self.controller.record(response, error, elapsed)
+            
+            if error is None:
+                self.metrics.observe('http_request_seconds', elapsed)
+                self.metrics.inc('http_requests_total', status=response.status_code)
+                self.metrics.inc('http_response_bytes_total', len(response.content))
+            
+            delay = self.controller.retry_delay(attempt, response) if outcome == 'transient' else None
+            if delay is None:
+                if error is not None:
+                    self.metrics.inc('fetch_errors_total', kind=self.classify_error(error))
+                    raise error
+                return response, elapsed
+            
+            reason = self.classify_error(error) if error is not None else f"http_{response.status_code}"
+            print(f"  Retrying {url} in {delay:.1f}s ({reason})")
+            self.metrics.inc('http_retries_total', reason=reason)
+            time.sleep(delay)
+            attempt += 1
+    
+    def archive_cached(self, url, entry):
+        """Archive a page served from the cache, unless the archive already has it"""
+        if self.archive is not None and url not in self.archive:
+            self.archive.write(url, 200, {}, entry['body'])
+    
+    def classify_error(self, error):
+        """Short error class for metrics: timeout, connection, http_4xx, http_5xx, ..."""
+        if isinstance(error, requests.Timeout):
+            return 'timeout'
+        if isinstance(error, requests.ConnectionError):
+            return 'connection'
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return f"http_{error.response.status_code // 100}xx"
+        return 'other'
+    
+    def needs_request(self, url):
+        """Whether fetching url goes to the network (and so should be rate limited)"""
+        return self.replay is None and not (self.cache and self.cache.fresh(url))
+    
+    def get_main_page(self, url=None):
         """Get the main Q&A page"""
+        url = url or self.main_url
         try:
             print(f"Fetching main page: {url}")
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            return BeautifulSoup(response.content, 'html.parser')
+            return self.parse_listing(self.fetch(url))
         except Exception as e:
             print(f"Error fetching main page: {e}")
             return None
     
+    def parse_listing(self, content):
+        """Parse only the question links of a listing page"""
+        return BeautifulSoup(content, self.parser, parse_only=QUESTION_LINK_STRAINER)
+    
+    def parse_page(self, content):
+        """Parse a question page from its <body> tag on
+        
+        The page is decoded the way BeautifulSoup would decode all of it
+        (BOM, meta charset, then fallbacks), so the head can be cut off
+        before parsing. Pages without a clean </head><body> boundary are
+        parsed whole.
+        """
+        if isinstance(content, bytes):
+            content = UnicodeDammit(content, is_html=True).unicode_markup
+        match = BODY_START_RE.search(content)
+        if not match:
+            self.metrics.inc('fallback_total', path='full_page_parse')
+            return BeautifulSoup(content, self.parser)
+        return BeautifulSoup(content[match.start(1):], self.parser)
+    
     def extract_question_links(self, soup):
         """Extract all question links from the main page"""
         question_links = []
@@ -57,37 +272,113 @@ class BibelQAScraper:
                 'type': qtype,
                 'question': text,
                 'href': href,
-                'full_url': urljoin(self.base_url, href)
+                'full_url': urldefrag(urljoin(self.base_url, href)).url
             })
         
         return question_links
     
+    def extract_listing_links(self, soup, page_url):
+        """URLs of the listing and pagination pages linked from a listing page"""
+        urls = []
+        for link in soup.find_all('a', href=lambda href: href and 'QandA.php' in href):
+            href = link.get('href')
+            if parse_qs(urlparse(href).query).get('sel', ['0'])[0] == '0':
+                urls.append(urldefrag(urljoin(page_url, href)).url)
+        return urls
+    
     def get_question_answer(self, question_data):
         """Get the full question and answer content"""
         try:
             print(f"Fetching Q&A {question_data['id']}: {question_data['question'][:50]}...")
             
-            response = self.session.get(question_data['full_url'], timeout=15)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            content = self.extract_and_format_content(soup)
-            
-            if content and content.get('question_content') and content.get('answer_content'):
-                question_data.update(content)
-            else:
-                question_data['question_content'] = question_data['question']
-                question_data['answer_content'] = "Innehållet kunde inte extraheras korrekt."
-            
-            return question_data
-            
+            content = self.fetch(question_data['full_url'])
+        except Exception as e:
+            return self.record_fetch_error(question_data, e)
+        
+        try:
+            return self.process_question_page(question_data, content)
         except Exception as e:
-            print(f"Error fetching Q&A {question_data['id']}: {e}")
-            question_data['error'] = str(e)
+            return self.record_extraction_error(question_data, e)
+    
+    def process_question_page(self, question_data, content):
+        """Extract question and answer from a fetched page into question_data"""
+        if question_data['id'] == self.profile_page:
+            extracted = self.profile_call(f"page_{question_data['id']}", self.extract_page, content)
+        else:
+            extracted = self.extract_page(content)
+        return self.apply_extracted_content(question_data, extracted)
+    
+    def extract_page(self, content):
+        """Parse a raw page and extract its question and answer (or None)"""
+        with self.metrics.timer('parse_seconds'):
+            soup = self.parse_page(content)
+        with self.metrics.timer('extract_seconds'):
+            return self.extract_and_format_content(soup)
+    
+    def apply_extracted_content(self, question_data, content):
+        """Merge the result of extract_page() into question_data"""
+        if content and content.get('question_content') and content.get('answer_content'):
+            question_data.update(content)
+            question_data['references'] = extract_references(
+                f"{content['question_content']}\n{content['answer_content']}")
+            self.metrics.inc('pages_total', outcome='extracted')
+        else:
             question_data['question_content'] = question_data['question']
-            question_data['answer_content'] = f"Fel vid hämtning: {e}"
-            return question_data
+            question_data['answer_content'] = "Innehållet kunde inte extraheras korrekt."
+            self.metrics.inc('pages_total', outcome='not_extracted')
+        
+        return question_data
+    
+    def profile_call(self, label, func, *args):
+        """Run func under pyinstrument (if installed) or cProfile and report where time went"""
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+        
+        if Profiler:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                return func(*args)
+            finally:
+                profiler.stop()
+                with open(f"profile_{label}.html", 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+                print(profiler.output_text())
+                print(f"Profile saved to profile_{label}.html")
+        
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args)
+        finally:
+            profiler.dump_stats(f"profile_{label}.prof")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+            print(f"Profile saved to profile_{label}.prof")
+    
+    def record_fetch_error(self, question_data, error):
+        """Record a failed fetch in question_data"""
+        print(f"Error fetching Q&A {question_data['id']}: {error}")
+        self.metrics.inc('pages_total', outcome='error')
+        question_data['error'] = str(error)
+        # Transient failures are fetched again on --resume; permanent ones are not
+        question_data['error_kind'] = 'transient' if is_transient(error) else 'permanent'
+        question_data['question_content'] = question_data['question']
+        question_data['answer_content'] = f"Fel vid hämtning: {error}"
+        return question_data
+    
+    def record_extraction_error(self, question_data, error):
+        """Record a page that was fetched but could not be extracted (parser error, crashed worker)
+        
+        These are always tried again on --resume: the page itself may be fine.
+        """
+        print(f"Error extracting Q&A {question_data['id']}: {error}")
+        self.metrics.inc('pages_total', outcome='error')
+        question_data['error'] = str(error)
+        question_data['error_kind'] = 'extraction'
+        question_data['question_content'] = question_data['question']
+        question_data['answer_content'] = f"Fel vid extrahering: {error}"
+        return question_data
     
     def extract_and_format_content(self, soup):
         """Extract ALL content and format it beautifully"""
@@ -99,6 +390,7 @@ class BibelQAScraper:
         # Find the main content area
         content_area = self.find_main_content_area(soup)
         if not content_area:
+            self.metrics.inc('fallback_total', path='no_content_area')
             return None
         
         # Extract and format question
@@ -115,6 +407,7 @@ class BibelQAScraper:
         
         # Fallback: if no clear question found, treat everything as content
         if not question:
+            self.metrics.inc('fallback_total', path='no_question')
             all_content = self.extract_all_formatted_content(content_area, "")
             if all_content:
                 # Try to split into question and answer based on content
@@ -123,6 +416,7 @@ class BibelQAScraper:
                     question = lines[0]
                     answer = '\n\n'.join(lines[1:])
                 else:
+                    self.metrics.inc('fallback_total', path='question_not_identified')
                     question = "Fråga inte tydligt identifierad"
                     answer = all_content
                 
@@ -136,50 +430,116 @@ class BibelQAScraper:
     def find_main_content_area(self, soup):
         """Find the main content area with intelligent detection"""
         
+        # Pages with a known layout go straight to where the content was before
+        key = None
+        if self.template_cache is not None:
+            key = fingerprint(soup)
+            content_area = self.cached_content_area(soup, key)
+            if content_area is not None:
+                return content_area
+        
+        # Text lengths for every element come from one bottom-up walk, so
+        # nested candidates don't re-read their descendants' text
+        nodes = list(soup.descendants)
+        text_lengths = self.measure_text_lengths(nodes)
+        
         # Try different strategies to find content
-        candidates = []
-        
-        # Strategy 1: Look for tables with substantial content
-        tables = soup.find_all('table')
-        for table in tables:
-            text_length = len(table.get_text(strip=True))
-            if text_length > 300:
-                candidates.append(('table', text_length, table))
-        
-        # Strategy 2: Look for divs with content classes
-        content_divs = soup.find_all('div', class_=re.compile(r'content|main|body|newspaper'))
-        for div in content_divs:
-            text_length = len(div.get_text(strip=True))
-            if text_length > 100:
-                candidates.append(('div', text_length, div))
-        
-        # Strategy 3: Look for any element with substantial content
-        all_containers = soup.find_all(['article', 'section', 'main', 'td'])
-        for container in all_containers:
-            text_length = len(container.get_text(strip=True))
-            if text_length > 300:
-                candidates.append(('container', text_length, container))
-        
-        # Return the element with the most content
+        tables, content_divs, containers = [], [], []
+        
+        for node in nodes:
+            if not isinstance(node, Tag):
+                continue
+            text_length = text_lengths.get(id(node), 0)
+            
+            # Strategy 1: Look for tables with substantial content
+            if node.name == 'table':
+                if text_length > CONTENT_AREA_MIN_TEXT['table']:
+                    tables.append(('table', text_length, node))
+            
+            # Strategy 2: Look for divs with content classes
+            elif node.name == 'div':
+                if text_length > CONTENT_AREA_MIN_TEXT['div'] and CONTENT_CLASS_RE.search(' '.join(node.get('class') or [])):
+                    content_divs.append(('div', text_length, node))
+            
+            # Strategy 3: Look for any element with substantial content
+            elif node.name in ('article', 'section', 'main', 'td'):
+                if text_length > CONTENT_AREA_MIN_TEXT['container']:
+                    containers.append(('container', text_length, node))
+        
+        # Return the element with the most content (earliest strategy wins ties)
+        candidates = tables + content_divs + containers
+        self.metrics.observe('content_area_candidates', len(candidates))
         if candidates:
-            candidates.sort(key=lambda x: x[1], reverse=True)
-            return candidates[0][2]
+            strategy, _, best = max(candidates, key=lambda x: x[1])
+            self.metrics.inc('content_area_strategy_total', strategy=strategy)
+            if key is not None:
+                self.template_cache.learn(key, best, strategy)
+            return best
         
+        self.metrics.inc('fallback_total', path='body_as_content_area')
         return soup.find('body')
     
+    def cached_content_area(self, soup, key):
+        """Content area at the path learned for this page layout, or None
+        
+        The node must still pass the text-length check of the strategy that
+        first chose it; otherwise the full search runs and relearns the path.
+        """
+        template = self.template_cache.get(key)
+        if template is None:
+            self.metrics.inc('template_cache_total', result='miss')
+            return None
+        
+        content_area = resolve_path(soup, template['path'])
+        if content_area is None or not self.has_text_over(content_area, CONTENT_AREA_MIN_TEXT[template['strategy']]):
+            self.metrics.inc('template_cache_total', result='rejected')
+            return None
+        
+        self.metrics.inc('template_cache_total', result='hit')
+        return content_area
+    
+    def has_text_over(self, element, limit):
+        """len(element.get_text(strip=True)) > limit, reading only as much text as needed"""
+        length = 0
+        for text in element.stripped_strings:
+            length += len(text)
+            if length > limit:
+                return True
+        return False
+    
+    def measure_text_lengths(self, nodes):
+        """Map id() of each tag in nodes to len(tag.get_text(strip=True))
+        
+        nodes must be in document order. Walking it backwards visits every
+        descendant before its ancestors, so each length is added to the
+        parent exactly once.
+        """
+        text_lengths = {}
+        for node in reversed(nodes):
+            if isinstance(node, Tag):
+                length = text_lengths.get(id(node), 0)
+            elif type(node) in TEXT_STRING_TYPES:
+                length = len(node.strip())
+            else:
+                # Comments, doctypes, script/style strings etc. are not part of get_text(),
+                # which counts only plain strings and CDATA
+                continue
+            if length and node.parent is not None:
+                text_lengths[id(node.parent)] = text_lengths.get(id(node.parent), 0) + length
+        return text_lengths
+    
     def extract_formatted_question(self, content_area):
         """Extract and format the question beautifully"""
         
         # Look for question in headers
         question_candidates = []
         
-        # Check h1-h6 tags
-        for level in range(1, 7):
-            headers = content_area.find_all(f'h{level}')
-            for header in headers:
-                text = self.preserve_formatting(header)
-                if len(text.strip()) > 20:
-                    question_candidates.append(text)
+        # Check h1-h6 tags in one pass, h1s first (sorted() keeps document order per level)
+        headers = sorted(content_area.find_all(HEADER_TAGS), key=lambda header: header.name)
+        for header in headers:
+            text = self.preserve_formatting(header)
+            if len(text.strip()) > 20:
+                question_candidates.append(text)
         
         # If no headers, look for italic text in the beginning (common pattern)
         if not question_candidates:
@@ -199,49 +559,39 @@ class BibelQAScraper:
     def extract_all_formatted_content(self, content_area, question_text):
         """Extract ALL content from the area and format it beautifully"""
         
-        # Create a copy to work with so we don't modify the original
-        content_copy = BeautifulSoup(str(content_area), 'html.parser')
-        
         # Remove the question elements to avoid duplication (only if we found a clear question)
+        removed_headers = []
         if question_text and len(question_text.strip()) > 20:
-            for header in content_copy.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-                if question_text.strip() in header.get_text().strip():
-                    header.decompose()
-        
-        # Extract ALL text content with formatting preserved
-        all_content_sections = []
+            for header in content_area.find_all(HEADER_TAGS):
+                if question_text.strip() in self._round_trip_text(header, content_area).strip():
+                    removed_headers.append(header)
         
-        # Get all meaningful elements in document order
-        all_elements = content_copy.find_all(['p', 'div', 'span', 'b', 'strong', 'i', 'em', 'br', 'hr', 'ul', 'ol', 'li', 'blockquote', 'td'])
-        
-        # Process each element and preserve its formatting
-        for element in all_elements:
-            # Skip if this element is contained within another element we'll process
-            if element.find_parent(['p', 'div'], recursive=False) and element.name in ['span', 'b', 'strong', 'i', 'em']:
-                continue
-                
-            formatted_text = self.preserve_formatting(element)
-            if formatted_text and formatted_text.strip():
-                all_content_sections.append(formatted_text)
+        # Extract ALL text content with formatting preserved, in one pass
+        # over the content area (which is left untouched)
+        all_content_sections, full_text = self.stream_formatted_sections(content_area, removed_headers)
         
         # If we didn't get much from structured elements, get all text
         if not all_content_sections or len(' '.join(all_content_sections).strip()) < 100:
             # Fallback: get all text content with basic structure preservation
-            full_text = self.preserve_formatting(content_copy)
+            self.metrics.inc('fallback_total', path='full_text')
             if full_text and full_text.strip():
                 all_content_sections = [full_text]
         
         # Combine all sections
         if all_content_sections:
             # Remove duplicates while preserving order
-            unique_sections = []
+            candidates = []
             seen_content = set()
             
             for section in all_content_sections:
                 section_clean = re.sub(r'\s+', ' ', section.strip().lower())
                 if section_clean and section_clean not in seen_content and len(section_clean) > 10:
                     seen_content.add(section_clean)
-                    unique_sections.append(section.strip())
+                    candidates.append((section_clean, section.strip()))
+            
+            # Nested elements repeat their children's text: drop sections
+            # that are contained in another one
+            unique_sections = self.drop_contained_sections(candidates)
             
             if unique_sections:
                 full_content = self.combine_sections(unique_sections)
@@ -249,6 +599,194 @@ class BibelQAScraper:
         
         return ""
     
+    def drop_contained_sections(self, candidates):
+        """Sections whose normalized text isn't part of a longer kept section, in original order
+        
+        candidates are (normalized text, section) pairs without exact
+        repeats. Longest sections are kept first and appended to one string
+        of kept text, so each containment check is a single substring search
+        (linear in the kept text, done in C).
+        """
+        kept_text = ''
+        keep = [False] * len(candidates)
+        for i in sorted(range(len(candidates)), key=lambda i: -len(candidates[i][0])):
+            section_clean = candidates[i][0]
+            if section_clean in kept_text:
+                continue
+            # Normalized text has no newlines, so no match can span two sections
+            kept_text += '\n' + section_clean
+            keep[i] = True
+        
+        unique_sections = [section for (_, section), kept in zip(candidates, keep) if kept]
+        self.metrics.inc('contained_sections_total', len(candidates) - len(unique_sections))
+        return unique_sections
+    
+    def stream_formatted_sections(self, content_area, removed_headers=()):
+        """Format every section element of content_area in a single walk
+        
+        Returns the non-empty preserve_formatting() output of each section
+        element (p, div, td, li, ...) in document order, skipping inline
+        elements inside a p/div, plus the formatted text of the whole area.
+        Subtrees in removed_headers are treated as absent.
+        
+        The tree is visited bottom-up once; each tag is summarized by the
+        strings preserve_formatting() would build from its descendants, so
+        parents reuse their children's work instead of re-walking them.
+        """
+        removed = {id(header) for header in removed_headers}
+        sections = {}
+        
+        def open_frame(tag, order, in_block, in_pre):
+            in_pre = in_pre or tag.name in ('pre', 'textarea')
+            return SectionFrame(tag, self._child_units(tag, removed, in_pre), order, in_block, in_pre)
+        
+        order = 0
+        root_summary = None
+        stack = [open_frame(content_area, order, False, False)]
+        
+        while stack:
+            frame = stack[-1]
+            tag = frame.tag
+            
+            if frame.next_unit < len(frame.units):
+                unit = frame.units[frame.next_unit]
+                frame.next_unit += 1
+                if isinstance(unit, Tag):
+                    order += 1
+                    # The old per-element check was find_parent(['p', 'div'], recursive=False).
+                    # find_parent() takes no `recursive`, so it became an attribute filter:
+                    # any p/div ancestor *without* a "recursive" attribute counts. Kept as is.
+                    in_block = frame.in_block or (tag.name in ('p', 'div') and not tag.has_attr('recursive'))
+                    stack.append(open_frame(unit, order, in_block, frame.in_pre))
+                else:
+                    self._add_to_summary(frame, None, unit)
+                continue
+            
+            # All children done: summarize this tag and hand it to the parent
+            stack.pop()
+            summary = self._close_summary(frame)
+            
+            if tag.name in SECTION_TAGS and not (frame.in_block and tag.name in INLINE_TAGS):
+                formatted_text = self._format_summary(summary)
+                if formatted_text and formatted_text.strip():
+                    sections[frame.order] = formatted_text
+            
+            if stack:
+                self._add_to_summary(stack[-1], tag, summary)
+            else:
+                root_summary = summary
+        
+        # The whole area formatted as if it were the only child of a document
+        inner, text, single = root_summary[0], root_summary[1], root_summary[3]
+        area_token = self._block_token(content_area.name, text)
+        full_text = self._format_summary((area_token + inner, text, area_token + inner, single))
+        
+        return [sections[key] for key in sorted(sections)], full_text
+    
+    def _child_units(self, tag, removed, in_pre=False):
+        """Children of tag with removed subtrees dropped and adjacent plain strings merged
+        
+        Merging matches how the strings would read back after the tree was
+        serialized and parsed again (e.g. text on both sides of a removed
+        script tag becomes one string). in_pre only counts pre/textarea
+        from tag up to the content area: a pre around the area is lost in
+        that round trip, so whitespace it kept gets shrunk too.
+        """
+        units = []
+        pending = []
+        
+        def flush():
+            text = ''.join(pending)
+            # html.parser shrinks whitespace-only strings outside pre/textarea
+            if not in_pre and not text.strip(ASCII_SPACES):
+                text = '\n' if '\n' in text else ' '
+            units.append(NavigableString(text))
+            pending.clear()
+        
+        for child in tag.contents:
+            if type(child) is NavigableString:
+                pending.append(str(child))
+                continue
+            if pending:
+                flush()
+            if isinstance(child, Tag):
+                if id(child) not in removed:
+                    units.append(child)
+            else:
+                units.append(child)
+        if pending:
+            flush()
+        return units
+    
+    def _round_trip_text(self, tag, content_area):
+        """get_text() of tag as it reads in a reparsed copy of content_area (see _child_units())"""
+        in_pre = any(parent.name in ('pre', 'textarea') for parent in tag.parents
+                     if parent is not content_area and content_area in parent.parents)
+        
+        def text_of(node, in_pre):
+            in_pre = in_pre or node.name in ('pre', 'textarea')
+            parts = []
+            for unit in self._child_units(node, (), in_pre):
+                if isinstance(unit, Tag):
+                    parts.append(text_of(unit, in_pre))
+                elif type(unit) in TEXT_STRING_TYPES:
+                    parts.append(str(unit))
+            return ''.join(parts)
+        
+        return text_of(tag, in_pre)
+    
+    def _add_to_summary(self, frame, child_tag, value):
+        """Append a child (a string, or a tag's summary) to the parent frame's parts"""
+        if child_tag is None:
+            # Strings add no parts of their own: preserve_formatting() treats
+            # every descendant with a .name as a tag, and strings have name None
+            if type(value) in TEXT_STRING_TYPES:
+                frame.text_parts.append(str(value))
+            frame.child_values.append(value)
+            return
+        
+        inner, text, _, single = value
+        if child_tag.name == 'br':
+            token = '\n'
+        elif child_tag.name == 'hr':
+            token = '\n' + '─' * 50 + '\n'
+        else:
+            token = ''
+        frame.inner_parts.append(token + inner)
+        frame.own_parts.append(self._block_token(child_tag.name, text) or token)
+        frame.own_parts.append(inner)
+        frame.text_parts.append(text)
+        frame.child_values.append(single)
+    
+    def _close_summary(self, frame):
+        """(inner, text, own, single) summary of a finished tag
+        
+        inner: parts contributed to an ancestor's preserve_formatting()
+        text:  get_text()
+        own:   parts of preserve_formatting() on this tag itself
+        single: the tag's .string, or None
+        """
+        values = frame.child_values
+        single = values[0] if len(values) == 1 else None
+        return (''.join(frame.inner_parts), ''.join(frame.text_parts), ''.join(frame.own_parts), single)
+    
+    def _block_token(self, name, text):
+        """Part added for a p/div that is a direct child of the formatted element"""
+        if name in ('p', 'div') and text.strip():
+            return f"\n{text.strip()}\n"
+        return ''
+    
+    def _format_summary(self, summary):
+        """preserve_formatting() result computed from a tag summary"""
+        _, text, own, single = summary
+        if single:
+            return self.clean_and_beautify_text(single)
+        if len(own.strip()) < 20 and text.strip():
+            return self.clean_and_beautify_text(text)
+        if own:
+            return self.clean_and_beautify_text(own)
+        return ""
+    
     def preserve_formatting(self, element):
         """Preserve natural formatting and structure of ALL text"""
         
@@ -348,47 +886,61 @@ class BibelQAScraper:
         if not text:
             return ""
         
-        # Decode HTML entities
-        text = html.unescape(text)
-        
-        # Fix encoding issues
-        encoding_fixes = {
-            'â€‹': '',      # Zero-width space
-            'â€"': '–',     # En dash  
-            'â€™': "'",     # Right single quotation
-            'â€œ': '"',     # Left double quotation
-            'â€': '"',      # Right double quotation
-            'Ã¥': 'å',      # Swedish å
-            'Ã¤': 'ä',      # Swedish ä  
-            'Ã¶': 'ö',      # Swedish ö
-            'Ã…': 'Å',      # Swedish Å
-            'Ã„': 'Ä',      # Swedish Ä
-            'Ã–': 'Ö',      # Swedish Ö
-        }
-        
-        for wrong, correct in encoding_fixes.items():
-            text = text.replace(wrong, correct)
-        
-        # Normalize excessive whitespace but preserve intentional line breaks
-        # Replace multiple spaces with single space
-        text = re.sub(r'[ \t]+', ' ', text)
-        
-        # Preserve double line breaks (paragraph separators)
-        # But reduce triple+ line breaks to double
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
+        # Entities and mojibake need a '&', 'Ã' or 'â'; most strings have none
+        if '&' in text or 'Ã' in text or 'â' in text:
+            # Decode HTML entities
+            text = html.unescape(text)
+            
+            # Fix encoding issues, skipping groups whose prefix is absent
+            for prefix, fixes in ENCODING_FIXES.items():
+                if prefix in text:
+                    for wrong, correct in fixes:
+                        text = text.replace(wrong, correct)
         
-        # Clean up line breaks at start and end
-        text = text.strip()
+        # Normalize excessive whitespace but preserve intentional line breaks.
+        # Only runs that actually change are matched (a lone space is left alone)
+        text = SPACE_RUN_RE.sub(' ', text)
         
-        # Ensure proper spacing around formatting marks
-        text = re.sub(r'\*\*([^*]+)\*\*', r'**\1**', text)
-        text = re.sub(r'\*([^*]+)\*', r'*\1*', text)
+        # Reduce triple+ line breaks to double
+        if text.count('\n') > 2:
+            text = LINE_BREAK_RUN_RE.sub('\n\n', text)
         
-        return text
+        # Clean up line breaks at start and end
+        return text.strip()
     
-    def scrape_all_questions(self, max_questions=None):
-        """Scrape all questions and answers with beautiful formatting"""
+    def scrape_all_questions(self, max_questions=None, concurrency=None, rate=2.0, burst=2,
+                             sink=None, skip_ids=None, workers=None):
+        """Scrape all questions and answers with beautiful formatting
+        
+        With `concurrency` set, pages are fetched concurrently and paced by a
+        per-host token bucket (`rate` requests/second, bursts of `burst`)
+        instead of sleeping between pages. Results keep the link order.
+        Within that, self.controller adapts how many requests are in flight
+        to the server's latency and errors, and retries transient failures.
+        
+        Each record is passed to `sink.write()` as soon as it is extracted
+        (in link order). Questions whose ID is in `skip_ids` are not fetched.
+        `workers` moves extraction to a process pool in concurrent mode.
+        """
+        
+        question_links = self.get_question_links()
+        if not question_links:
+            return []
+        
+        if skip_ids:
+            question_links = [q for q in question_links if q['id'] not in skip_ids]
+            print(f"Skipping already completed questions, {len(question_links)} left")
         
+        if max_questions:
+            question_links = question_links[:max_questions]
+            print(f"Processing first {max_questions} questions")
+        
+        return self.scrape_questions(question_links, concurrency, rate, burst, sink, workers)
+    
+    def get_question_links(self):
+        """Fetch the main page and return its question links ([] on failure)"""
+        if self.frontier:
+            return self.crawl_question_links()
         soup = self.get_main_page()
         if not soup:
             print("Could not fetch main page")
@@ -399,32 +951,178 @@ class BibelQAScraper:
         
         if not question_links:
             print("No question links found")
-            return []
-        
-        if max_questions:
-            question_links = question_links[:max_questions]
-            print(f"Processing first {max_questions} questions")
+        return question_links
+    
+    def crawl_question_links(self):
+        """Question links of every listing and pagination page reachable from the homepage
+        
+        Breadth-first over self.frontier, which drops pages and questions
+        already seen. If a listing page can't be fetched the crawl stops and
+        [] is returned (a partial listing would look like removed questions
+        to --sync); the next run resumes from that page.
+        """
+        frontier = self.frontier
+        if frontier.pending():
+            print(f"Resuming crawl: {len(frontier.question_links())} question links found so far")
+        else:
+            frontier.reset()
+            frontier.add_listing(self.main_url)
+        
+        pages = 0
+        while (page := frontier.next()) is not None:
+            # Paced like sequential question pages: the crawl is one request at a time
+            if pages and self.needs_request(page['url']):
+                time.sleep(self.controller.pacing_delay(2))
+            soup = self.get_main_page(page['url'])
+            if soup is None:
+                print("Crawl stopped; run again to resume from this page")
+                return []
+            for link in self.extract_question_links(soup):
+                frontier.add_question(link)
+            for url in self.extract_listing_links(soup, page['url']):
+                frontier.add_listing(url, page['depth'] + 1)
+            frontier.done()
+            pages += 1
+            self.metrics.inc('crawl_pages_total')
+        
+        question_links = frontier.question_links()
+        print(f"Found {len(question_links)} question links on {pages} listing pages")
+        print(frontier.summary())
+        return question_links
+    
+    def scrape_questions(self, question_links, concurrency=None, rate=2.0, burst=2, sink=None, workers=None):
+        """Fetch and extract the given question links (see scrape_all_questions)"""
+        if concurrency:
+            return asyncio.run(self.scrape_questions_async(question_links, concurrency, rate, burst, sink,
+                                                           workers))
         
         results = []
         
         for i, question_data in enumerate(question_links, 1):
             print(f"\nProcessing {i}/{len(question_links)}")
             
+            # Decided before the fetch, which refreshes the cache entry
+            went_to_network = self.needs_request(question_data['full_url'])
             complete_qa = self.get_question_answer(question_data)
             results.append(complete_qa)
+            if sink:
+                sink.write(complete_qa)
+            self.report_result(complete_qa)
             
-            # Show preview of extracted content
-            if complete_qa.get('question_content') and complete_qa.get('answer_content'):
-                print(f"  ✓ Successfully extracted content")
-                print(f"    Question: {complete_qa['question_content'][:100]}...")
-                print(f"    Answer: {complete_qa['answer_content'][:150]}...")
-            else:
-                print(f"  ✗ Content extraction incomplete")
-            
-            time.sleep(2)
+            if went_to_network:
+                time.sleep(self.controller.pacing_delay(2))
         
         return results
     
+    async def scrape_questions_async(self, question_links, concurrency=4, rate=2.0, burst=2, sink=None,
+                                     workers=None):
+        """Fetch and extract question pages concurrently, returning results in link order
+        
+        Without `workers`, each page is extracted in the thread that fetched
+        it. With `workers`, fetched pages go on a bounded queue that feeds a
+        pool of that many extraction processes, so parsing uses every core
+        and never holds up the next request.
+        """
+        
+        limiter = HostRateLimiter(rate, burst)
+        semaphore = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        total = len(question_links)
+        done = 0
+        finished = [loop.create_future() for _ in question_links]
+        
+        # Let every worker thread keep its own pooled connection
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        def finish(i, complete_qa):
+            nonlocal done
+            done += 1
+            print(f"\nProcessed {done}/{total} (Q&A {complete_qa['id']})")
+            self.report_result(complete_qa)
+            finished[i].set_result(complete_qa)
+        
+        async def fetch_one(i, question_data):
+            url = question_data['full_url']
+            async with semaphore:
+                # Pages served from the cache or an archive need no request slot
+                if self.needs_request(url):
+                    await limiter.acquire(url)
+                print(f"Fetching Q&A {question_data['id']}: {question_data['question'][:50]}...")
+                try:
+                    content = await loop.run_in_executor(io_executor, self.fetch, url)
+                except Exception as e:
+                    finish(i, self.record_fetch_error(question_data, e))
+                    return
+            
+            if queue is not None:
+                await queue.put((i, question_data, content))
+                return
+            try:
+                complete_qa = await loop.run_in_executor(io_executor, self.process_question_page,
+                                                         question_data, content)
+            except Exception as e:
+                complete_qa = self.record_extraction_error(question_data, e)
+            finish(i, complete_qa)
+        
+        async def extract_pages():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                i, question_data, content = item
+                try:
+                    if question_data['id'] == self.profile_page:
+                        # Profile in this process, where the report can be printed
+                        complete_qa = await loop.run_in_executor(io_executor, self.process_question_page,
+                                                                 question_data, content)
+                    else:
+                        extracted, worker_metrics = await loop.run_in_executor(process_pool, extract_page_worker,
+                                                                               content)
+                        self.metrics.merge(worker_metrics)
+                        complete_qa = self.apply_extracted_content(question_data, extracted)
+                except Exception as e:
+                    complete_qa = self.record_extraction_error(question_data, e)
+                finish(i, complete_qa)
+        
+        queue = asyncio.Queue(maxsize=2 * workers) if workers else None
+        template_cache_path = self.template_cache.path if self.template_cache else None
+        process_pool = ProcessPoolExecutor(max_workers=workers, initializer=init_extraction_worker,
+                                           initargs=(self.parser, template_cache_path)) if workers else None
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as io_executor:
+            try:
+                extractors = [asyncio.ensure_future(extract_pages()) for _ in range(workers or 0)]
+                fetchers = [asyncio.ensure_future(fetch_one(i, q)) for i, q in enumerate(question_links)]
+                
+                # Awaiting in link order hands each record to the sink as soon as
+                # it and everything before it are done
+                results = []
+                for future in finished:
+                    complete_qa = await future
+                    if sink:
+                        sink.write(complete_qa)
+                    results.append(complete_qa)
+                
+                await asyncio.gather(*fetchers)
+                for _ in extractors:
+                    await queue.put(None)
+                await asyncio.gather(*extractors)
+                return results
+            finally:
+                if process_pool:
+                    process_pool.shutdown()
+    
+    def report_result(self, complete_qa):
+        """Show preview of extracted content"""
+        if complete_qa.get('question_content') and complete_qa.get('answer_content'):
+            print(f"  ✓ Successfully extracted content")
+            print(f"    Question: {complete_qa['question_content'][:100]}...")
+            print(f"    Answer: {complete_qa['answer_content'][:150]}...")
+        else:
+            print(f"  ✗ Content extraction incomplete")
+    
     def save_formatted_content(self, data, filename='bibel_qa_formatted.json'):
         """Save beautifully formatted data to JSON"""
         try:
@@ -440,17 +1138,9 @@ class BibelQAScraper:
         """Save as readable Markdown file"""
         try:
             with open(filename, 'w', encoding='utf-8') as f:
-                f.write("# Bibel.se Frågor och Svar\n\n")
-                f.write("*Extraherat innehåll från bibel.se*\n\n")
-                f.write("---\n\n")
-                
+                self.write_markdown_header(f)
                 for i, qa in enumerate(data, 1):
-                    if qa.get('question_content') and qa.get('answer_content'):
-                        f.write(f"## Fråga {i} (ID: {qa['id']})\n\n")
-                        f.write(f"**Kategori:** {qa['type']}\n\n")
-                        f.write(f"### Fråga:\n{qa['question_content']}\n\n")
-                        f.write(f"### Svar:\n{qa['answer_content']}\n\n")
-                        f.write("---\n\n")
+                    self.write_markdown_record(f, i, qa)
             
             print(f"Markdown version saved to {filename}")
             return True
@@ -458,6 +1148,51 @@ class BibelQAScraper:
             print(f"Error saving markdown file: {e}")
             return False
     
+    def write_markdown_header(self, f):
+        f.write("# Bibel.se Frågor och Svar\n\n")
+        f.write("*Extraherat innehåll från bibel.se*\n\n")
+        f.write("---\n\n")
+    
+    def write_markdown_record(self, f, i, qa):
+        if qa.get('question_content') and qa.get('answer_content'):
+            f.write(f"## Fråga {i} (ID: {qa['id']})\n\n")
+            f.write(f"**Kategori:** {qa['type']}\n\n")
+            f.write(f"### Fråga:\n{qa['question_content']}\n\n")
+            f.write(f"### Svar:\n{qa['answer_content']}\n\n")
+            f.write("---\n\n")
+    
+    def save_outputs_from_jsonl(self, jsonl_filename, json_filename='bibel_qa_formatted.json',
+                                md_filename='bibel_qa.md'):
+        """Write the pretty JSON and Markdown files from a JSONL file
+        
+        When an ID occurs more than once (e.g. retried after a resume) the
+        last record wins. Only those records are parsed: a first read finds
+        their lines from the IDs at the start of each line. Returns the
+        number of records written.
+        """
+        try:
+            offsets = last_record_lines(jsonl_filename)
+            
+            count = 0
+            with open(json_filename, 'w', encoding='utf-8') as json_file, \
+                    open(md_filename, 'w', encoding='utf-8') as md_file:
+                self.write_markdown_header(md_file)
+                json_file.write('[')
+                for qa in read_jsonl_lines(jsonl_filename, offsets):
+                    # Same layout as json.dump(data, indent=2)
+                    item = json.dumps(qa, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+                    json_file.write((',\n  ' if count else '\n  ') + item)
+                    count += 1
+                    self.write_markdown_record(md_file, count, qa)
+                json_file.write('\n]' if count else ']')
+            
+            print(f"\nFormatted data saved to {json_filename}")
+            print(f"Markdown version saved to {md_filename}")
+            return count
+        except Exception as e:
+            print(f"Error saving formatted data: {e}")
+            return 0
+    
     def preview_formatting(self, qa_item):
         """Preview the formatting of a single Q&A item"""
         print("\n" + "="*80)
@@ -477,24 +1212,175 @@ class BibelQAScraper:
         
         print("\n" + "="*80 + "\n")
 
-def main():
-    scraper = BibelQAScraper()
+# Per-process scraper used by extraction workers
+_worker_scraper = None
+
+def init_extraction_worker(parser='html.parser', template_cache_path=None):
+    global _worker_scraper
+    # Layouts a worker learns are merged into the shared file right away
+    template_cache = TemplateCache(template_cache_path) if template_cache_path else None
+    _worker_scraper = BibelQAScraper(parser=parser, template_cache=template_cache)
+
+def extract_page_worker(content):
+    """Process-pool entry point: extract_page() on the worker's own scraper
+    
+    Returns the extracted content and the metrics recorded for this page.
+    """
+    _worker_scraper.metrics = Metrics()
+    extracted = _worker_scraper.extract_page(content)
+    if _worker_scraper.template_cache:
+        _worker_scraper.template_cache.save()
+    return extracted, _worker_scraper.metrics.export()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bibel.se Q&A scraper")
+    parser.add_argument('--base-url', default="https://bibel.se",
+                        help="site to scrape (e.g. a local stand-in server)")
+    parser.add_argument('--max-questions', type=int,
+                        help="number of questions to process (asked interactively if omitted)")
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help="concurrent requests; 0 fetches one page at a time with a fixed pause")
+    parser.add_argument('--rate', type=float, default=2.0,
+                        help="max requests per second per host in concurrent mode")
+    parser.add_argument('--burst', type=int, default=2,
+                        help="max burst of requests per host in concurrent mode")
+    parser.add_argument('--max-retries', type=int, default=3,
+                        help="retries per request for timeouts, dropped connections and 429/5xx")
+    parser.add_argument('--retry-budget', type=int, default=100,
+                        help="max retries in the whole run")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="extraction processes fed from the fetch queue in concurrent mode; "
+                             "0 extracts in the fetching threads")
+    parser.add_argument('--parser', choices=['html.parser', 'lxml'], default='html.parser',
+                        help="BeautifulSoup parser backend")
+    parser.add_argument('--archive', default='bibel_qa_pages.warc.gz',
+                        help="WARC-style archive every raw response is appended to")
+    parser.add_argument('--no-archive', action='store_true',
+                        help="don't archive raw responses")
+    parser.add_argument('--replay', metavar='ARCHIVE',
+                        help="re-extract everything from an archive without touching the network")
+    parser.add_argument('--metrics-file',
+                        help="write the run's metrics to this file in Prometheus text format")
+    parser.add_argument('--profile-page', metavar='ID',
+                        help="profile the extraction of this question ID (pyinstrument if installed, else cProfile)")
+    parser.add_argument('--template-cache', default='template_cache.json',
+                        help="file of learned content-area locations per page layout")
+    parser.add_argument('--no-template-cache', action='store_true',
+                        help="run the full content-area search on every page")
+    parser.add_argument('--crawl-state', metavar='DIR',
+                        help="find questions on every listing and pagination page, keeping a resumable "
+                             "crawl frontier in DIR (default: only the homepage listing)")
+    parser.add_argument('--cache-dir', default='http_cache',
+                        help="directory for the HTTP response cache")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always download pages in full")
+    parser.add_argument('--max-age', type=float, default=0,
+                        help="seconds a cached page is used without asking the server")
+    parser.add_argument('--jsonl', default='bibel_qa_formatted.jsonl',
+                        help="JSONL file each record is appended to as soon as it is extracted")
+    parser.add_argument('--resume', action='store_true',
+                        help="keep the existing JSONL file and skip questions already completed in it")
+    parser.add_argument('--db', metavar='FILE',
+                        help="also upsert every record into this SQLite database (full-text searchable)")
+    parser.add_argument('--search-index', metavar='DIR',
+                        help="export a sharded search index for the static site to this directory")
+    parser.add_argument('--verse-index', metavar='FILE',
+                        help="write a verse <-> question index of the Bible references in the answers")
+    parser.add_argument('--sync', metavar='SNAPSHOT',
+                        help="update this JSON snapshot, fetching only new and changed questions")
+    parser.add_argument('--delta',
+                        help="where --sync writes its delta (default: <snapshot>.delta.json)")
+    parser.add_argument('--js', metavar='FILE',
+                        help="also write the --sync snapshot as a qa_data.js-style script")
+    return parser.parse_args(argv)
+
+def report_run(scraper, args, cache, controller, template_cache):
+    """Save learned layouts and crawl state, print the cache, request and metrics summaries"""
+    if template_cache:
+        template_cache.save()
+    if scraper.frontier:
+        scraper.frontier.close()
+    
+    if cache:
+        print(f"\n{cache.summary()}")
+    if not args.replay:
+        print(controller.summary())
+    
+    print(f"\n{scraper.metrics.summary()}")
+    if args.metrics_file:
+        scraper.metrics.write_prometheus(args.metrics_file)
+        print(f"Metrics written to {args.metrics_file}")
+
+def export_indexes(json_filename, args):
+    """Build the search and verse indexes asked for on the command line from a JSON output file"""
+    if not (args.search_index or args.verse_index):
+        return
+    with open(json_filename, encoding='utf-8') as f:
+        records = json.load(f)
+    if args.search_index:
+        manifest = build_search_index(records, args.search_index)
+        print(f"Search index for {manifest['documents']} questions written to {args.search_index}")
+    if args.verse_index:
+        index = write_verse_index(records, args.verse_index)
+        print(f"Verse index for {len(index['question_to_references'])} questions written to {args.verse_index}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.replay:
+        cache, archive, replay = None, None, PageArchive(args.replay)
+    else:
+        cache = None if args.no_cache else ResponseCache(args.cache_dir, args.max_age)
+        archive = None if args.no_archive else PageArchive(args.archive)
+        replay = None
+    template_cache = None if args.no_template_cache else TemplateCache(args.template_cache)
+    controller = RequestController(max_concurrency=max(1, args.concurrency),
+                                   max_attempts=args.max_retries + 1, retry_budget=args.retry_budget)
+    frontier = CrawlFrontier(args.crawl_state) if args.crawl_state else None
+    scraper = BibelQAScraper(cache, parser=args.parser, archive=archive, replay=replay,
+                             base_url=args.base_url, controller=controller, template_cache=template_cache,
+                             frontier=frontier)
+    scraper.profile_page = args.profile_page
+    interactive = sys.stdin.isatty()
     
     print("=== Bibel.se Q&A Scraper - Beautiful Formatting ===")
     print("Fokus på vacker formatering och bevarad struktur\n")
     
-    max_questions = input("Antal frågor att bearbeta (eller Enter för alla): ").strip()
-    max_questions = int(max_questions) if max_questions.isdigit() else None
+    if args.sync:
+        delta = sync_questions(scraper, args.sync, args.delta, args.js, concurrency=args.concurrency,
+                               rate=args.rate, burst=args.burst, workers=args.workers)
+        report_run(scraper, args, cache, controller, template_cache)
+        if delta is None:
+            print("Ingen data kunde hämtas")
+        else:
+            export_indexes(args.sync, args)
+        return
+    
+    max_questions = args.max_questions
+    if max_questions is None and interactive:
+        max_questions = input("Antal frågor att bearbeta (eller Enter för alla): ").strip()
+        max_questions = int(max_questions) if max_questions.isdigit() else None
+    
+    skip_ids = completed_ids(args.jsonl) if args.resume else None
     
-    qa_data = scraper.scrape_all_questions(max_questions)
+    store = QAStore(args.db) if args.db else None
+    with JsonlSink(args.jsonl, append=args.resume) as sink:
+        if store:
+            sink = TeeSink(sink, store)
+        qa_data = scraper.scrape_all_questions(max_questions, concurrency=args.concurrency,
+                                               rate=args.rate, burst=args.burst,
+                                               sink=sink, skip_ids=skip_ids, workers=args.workers)
+    if store:
+        print(store.summary())
+        store.close()
+    report_run(scraper, args, cache, controller, template_cache)
     
-    if qa_data:
+    if qa_data or skip_ids:
         print(f"\n=== RESULTAT ===")
         print(f"Totalt bearbetade frågor: {len(qa_data)}")
         
         # Save in different formats
-        scraper.save_formatted_content(qa_data)
-        scraper.save_as_markdown(qa_data)
+        scraper.save_outputs_from_jsonl(args.jsonl)
+        export_indexes('bibel_qa_formatted.json', args)
         
         # Preview first successful extraction
         successful_items = [item for item in qa_data 
@@ -503,7 +1389,7 @@ def main():
         if successful_items:
             print(f"\nFramgångsrikt extraherade: {len(successful_items)}")
             
-            preview = input("\nVisa förhandsvisning av första frågan? (y/n): ").strip().lower()
+            preview = input("\nVisa förhandsvisning av första frågan? (y/n): ").strip().lower() if interactive else 'n'
             if preview == 'y':
                 scraper.preview_formatting(successful_items[0])
         else:
@@ -0,0 +1,187 @@
+"""Export the Q&A corpus as a sharded, precompressed search index for the static site.
+
+    python scrape/search_index.py bibel_qa_formatted.json [--out search_index]
+
+The page loads manifest.json, titles.json and terms.json up front; postings
+and answer shards are fetched only when a search or an opened answer needs
+them. Every file is also written gzipped (<name>.json.gz).
+
+    titles.json         [[id, type, question, full_url, answer shard], ...]
+    terms.json          {term: [postings shard, document frequency]}
+    postings_NNN.json   {term: [doc, weight, doc, weight, ...]}  (doc = index into titles)
+    answers_NNN.json    {id: answer_content}
+
+A term's weight in a document is its count in the answer plus
+QUESTION_WEIGHT times its count in the question. Queries must be normalized
+like the index: see normalize_text() and the folding and stop-word lists in
+the manifest.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+from sqlite_store import search_text
+from writers import write_json
+
+QUESTION_WEIGHT = 3
+POSTINGS_SHARD_BYTES = 8 * 1024
+ANSWERS_SHARD_BYTES = 16 * 1024
+WORD_RE = re.compile(r'\w+')
+
+# å, ä and ö are letters of their own in Swedish; their Danish/Norwegian and
+# German counterparts fold into them, other accents are dropped (é -> e)
+SWEDISH_LETTERS = set('åäö')
+LETTER_FOLDS = {'æ': 'ä', 'ø': 'ö', 'ü': 'y'}
+
+STOP_WORDS = frozenset('''
+alla allt andra att av bara blev bli blir de dem den denna deras dess dessa det detta dig din dina
+ditt du då där eller en er era ert ett efter från för ha hade han hans har hon honom hur här i
+icke ingen inga inget inte jag kan kunde man med mellan men mig min mina mitt mot mycket ni nu
+när någon något några och om oss på samma sedan sig sin sina sitt ska skall skulle som så sådan
+till under upp ut utan vad var vara varit vars vem vi vid vilka vilken vilket vår våra vårt än
+är åt över
+'''.split())
+
+
+@lru_cache(maxsize=None)
+def fold_char(ch):
+    if ch in SWEDISH_LETTERS:
+        return ch
+    if ch in LETTER_FOLDS:
+        return LETTER_FOLDS[ch]
+    if ch.isascii():
+        return ch
+    return ''.join(c for c in unicodedata.normalize('NFD', ch) if not unicodedata.combining(c))
+
+
+def normalize_text(text):
+    """Lowercase, drop soft hyphens and zero-width characters, fold accents"""
+    text = unicodedata.normalize('NFC', search_text(text)).lower()
+    return ''.join(map(fold_char, text))
+
+
+def index_terms(text):
+    """Searchable words of text: normalized, at least two characters, not stop-words"""
+    return [word for word in WORD_RE.findall(normalize_text(text))
+            if len(word) > 1 and word not in STOP_WORDS]
+
+
+def pack_shards(items, size_of, max_bytes):
+    """Split items, in order, into consecutive groups of about max_bytes each"""
+    shards, current, current_bytes = [], [], 0
+    for item in items:
+        size = size_of(item)
+        if current and current_bytes + size > max_bytes:
+            shards.append(current)
+            current, current_bytes = [], 0
+        current.append(item)
+        current_bytes += size
+    if current:
+        shards.append(current)
+    return shards
+
+
+def build_search_index(records, out_dir='search_index'):
+    """Write the index files for records (errored records are left out)
+
+    Returns the manifest.
+    """
+    records = [r for r in records if not r.get('error')]
+    os.makedirs(out_dir, exist_ok=True)
+
+    postings = {}
+    for doc, record in enumerate(records):
+        weights = Counter(index_terms(record.get('answer_content')))
+        for term in index_terms(record.get('question_content') or record.get('question')):
+            weights[term] += QUESTION_WEIGHT
+        for term, weight in weights.items():
+            postings.setdefault(term, []).extend((doc, weight))
+
+    # Terms in sorted order, so a prefix search reads neighbouring shards
+    term_shards = pack_shards(sorted(postings), lambda term: len(term) + 6 * len(postings[term]),
+                              POSTINGS_SHARD_BYTES)
+    answer_shards = pack_shards(range(len(records)), lambda doc: len(records[doc].get('answer_content', '')),
+                                ANSWERS_SHARD_BYTES)
+
+    terms = {}
+    postings_files = []
+    for shard, shard_terms in enumerate(term_shards):
+        name = f"postings_{shard:03d}.json"
+        write_json({term: postings[term] for term in shard_terms}, os.path.join(out_dir, name),
+                   indent=None, compress=True)
+        postings_files.append(name)
+        for term in shard_terms:
+            terms[term] = [shard, len(postings[term]) // 2]
+
+    answer_shard_of = {}
+    answers_files = []
+    for shard, docs in enumerate(answer_shards):
+        name = f"answers_{shard:03d}.json"
+        write_json({records[doc]['id']: records[doc].get('answer_content', '') for doc in docs},
+                   os.path.join(out_dir, name), indent=None, compress=True)
+        answers_files.append(name)
+        answer_shard_of.update(dict.fromkeys(docs, shard))
+
+    titles = [[r['id'], r.get('type'), r.get('question'), r.get('full_url'), answer_shard_of[doc]]
+              for doc, r in enumerate(records)]
+    write_json(titles, os.path.join(out_dir, 'titles.json'), indent=None, compress=True)
+    write_json(terms, os.path.join(out_dir, 'terms.json'), indent=None, compress=True)
+
+    manifest = {
+        'version': 1,
+        'documents': len(records),
+        'titles': 'titles.json',
+        'terms': 'terms.json',
+        'postings': postings_files,
+        'answers': answers_files,
+        'question_weight': QUESTION_WEIGHT,
+        'letter_folds': LETTER_FOLDS,
+        'stop_words': sorted(STOP_WORDS),
+    }
+    write_json(manifest, os.path.join(out_dir, 'manifest.json'), compress=True)
+
+    # Shards of an earlier, larger export would otherwise linger
+    current = set(postings_files + answers_files)
+    for path in glob.glob(os.path.join(out_dir, 'postings_*.json*')) + \
+            glob.glob(os.path.join(out_dir, 'answers_*.json*')):
+        if os.path.basename(path).removesuffix('.gz') not in current:
+            os.remove(path)
+    return manifest
+
+
+def index_size(out_dir):
+    """(total bytes, gzipped bytes, bytes needed for first paint) of an exported index"""
+    total = compressed = first_paint = 0
+    for path in glob.glob(os.path.join(out_dir, '*.json*')):
+        size = os.path.getsize(path)
+        if path.endswith('.gz'):
+            compressed += size
+            if os.path.basename(path) in ('manifest.json.gz', 'titles.json.gz', 'terms.json.gz'):
+                first_paint += size
+        else:
+            total += size
+    return total, compressed, first_paint
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a sharded search index for the static site")
+    parser.add_argument('input', help="JSON output of the scraper (a list of records)")
+    parser.add_argument('--out', default='search_index', help="directory for the index files")
+    args = parser.parse_args(argv)
+
+    with open(args.input, encoding='utf-8') as f:
+        records = json.load(f)
+    manifest = build_search_index(records, args.out)
+    total, compressed, first_paint = index_size(args.out)
+    print(f"Search index for {manifest['documents']} questions written to {args.out}: "
+          f"{len(manifest['postings'])} postings and {len(manifest['answers'])} answer shards, "
+          f"{total} bytes ({compressed} gzipped, {first_paint} gzipped for first paint)")
+
+
+if __name__ == "__main__":
+    main()
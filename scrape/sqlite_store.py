@@ -0,0 +1,164 @@
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+from datetime import datetime, timezone
+
+# Soft hyphens (U+00AD, all over the site's text) and zero-width characters
+# split words for the FTS tokenizer, so they are removed from indexed text
+INVISIBLE_CHARS = dict.fromkeys(map(ord, '\u00ad\u200b\u200c\u200d\u2060\ufeff'))
+QUERY_TERM_RE = re.compile(r'\w+\*?')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS qa (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    question TEXT,
+    error_kind TEXT,
+    data TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+-- unicode61 folds case but with remove_diacritics 0 keeps å, ä and ö
+-- apart from a and o, as Swedish needs
+CREATE VIRTUAL TABLE IF NOT EXISTS qa_fts USING fts5(
+    question_content, answer_content,
+    tokenize = 'unicode61 remove_diacritics 0'
+);
+"""
+
+
+def search_text(text):
+    """Text as indexed: without soft hyphens and zero-width characters"""
+    return (text or '').translate(INVISIBLE_CHARS)
+
+
+def content_hash(record):
+    data = json.dumps(record, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class QAStore:
+    """SQLite store of Q&A records with full-text search
+
+    Records are upserted by ID; a record whose content hash is unchanged is
+    not rewritten. qa_fts indexes question_content and answer_content under
+    the rowid of the record in qa. Usable as a scraper sink: write() takes
+    one record and changes are committed every commit_every records.
+    """
+
+    def __init__(self, path='bibel_qa.db', commit_every=10):
+        self.path = path
+        self.commit_every = commit_every
+        self.pending = 0
+        self.stats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def write(self, record):
+        """Insert or update record; returns 'inserted', 'updated' or 'unchanged'"""
+        digest = content_hash(record)
+        row = self.db.execute("SELECT rowid, content_hash FROM qa WHERE id = ?", (record['id'],)).fetchone()
+        if row and row['content_hash'] == digest:
+            self.stats['unchanged'] += 1
+            return 'unchanged'
+
+        values = (record.get('type'), record.get('question'), record.get('error_kind'),
+                  json.dumps(record, ensure_ascii=False), digest,
+                  datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'))
+        if row:
+            rowid = row['rowid']
+            self.db.execute("UPDATE qa SET type = ?, question = ?, error_kind = ?, data = ?, "
+                            "content_hash = ?, updated_at = ? WHERE rowid = ?", values + (rowid,))
+            self.db.execute("DELETE FROM qa_fts WHERE rowid = ?", (rowid,))
+            outcome = 'updated'
+        else:
+            rowid = self.db.execute("INSERT INTO qa (id, type, question, error_kind, data, content_hash, "
+                                    "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                    (record['id'],) + values).lastrowid
+            outcome = 'inserted'
+        if not record.get('error'):
+            self.db.execute("INSERT INTO qa_fts (rowid, question_content, answer_content) VALUES (?, ?, ?)",
+                            (rowid, search_text(record.get('question_content')),
+                             search_text(record.get('answer_content'))))
+
+        self.stats[outcome] += 1
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+        return outcome
+
+    def commit(self):
+        self.db.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, qid):
+        """Record with this ID, or None"""
+        row = self.db.execute("SELECT data FROM qa WHERE id = ?", (qid,)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def count(self, errors=False):
+        """Number of records (only failed ones if errors is set)"""
+        where = " WHERE error_kind IS NOT NULL" if errors else ""
+        return self.db.execute("SELECT count(*) FROM qa" + where).fetchone()[0]
+
+    def search(self, query, limit=20):
+        """Best matches for every word of query (word* matches prefixes)
+
+        Returns dicts with id, question and a snippet of the matching text,
+        best match first.
+        """
+        terms = QUERY_TERM_RE.findall(search_text(query))
+        if not terms:
+            return []
+        match = ' '.join(f'"{t[:-1]}"*' if t.endswith('*') else f'"{t}"' for t in terms)
+        rows = self.db.execute(
+            "SELECT qa.id, qa.question, snippet(qa_fts, -1, '[', ']', '…', 12) AS snippet "
+            "FROM qa_fts JOIN qa ON qa.rowid = qa_fts.rowid "
+            "WHERE qa_fts MATCH ? ORDER BY bm25(qa_fts) LIMIT ?", (match, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def summary(self):
+        s = self.stats
+        return (f"Database {self.path}: {s['inserted']} inserted, {s['updated']} updated, "
+                f"{s['unchanged']} unchanged; {self.count()} records")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search or load the Q&A database")
+    parser.add_argument('database', help="SQLite file written by scrape_qna.py --db")
+    parser.add_argument('query', nargs='?', help="words to search for (word* for prefixes)")
+    parser.add_argument('--id', help="print the record with this ID")
+    parser.add_argument('--load', metavar='JSON', help="upsert the records of a JSON output file")
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with QAStore(args.database) as store:
+        if args.load:
+            with open(args.load, encoding='utf-8') as f:
+                for record in json.load(f):
+                    store.write(record)
+            print(store.summary())
+        if args.id:
+            print(json.dumps(store.get(args.id), ensure_ascii=False, indent=2))
+        if args.query:
+            for hit in store.search(args.query, args.limit):
+                print(f"{hit['id']:>6}  {hit['question'][:70]}\n        {hit['snippet']}")
+        if not (args.load or args.id or args.query):
+            print(f"{store.count()} records, {store.count(errors=True)} with errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Regenerate the verse-variant dataset from SRBgrundtextskillnader.pdf.
+
+    python scrape/srb_variants.py [PDF] [--out-dir vers_diff_vite/src/data] [--workers N]
+
+The PDF lists, verse by verse, where the Textus Receptus (1894) and the
+United Bible Societies text (UN, 1975) differ:
+
+    Matt. 1:25 . men rörde henne inte, förrän hon hade fött sin
+    Son, den förstfödde*...
+    *UN: en son.
+
+Pages are read one at a time and parsed in a process pool (text
+extraction is the slow part); entries that run over a page break are
+joined when the pages are merged back in order. The variants are written
+as verse_data_complete_1130.js (the app's `allVariants`), the same data
+as .json, and the verse list 1130_verse_SRB_extracted. Categories and
+impact notes are curated by hand: they are carried over by verse from the
+dataset being replaced, and new verses get category "minor".
+
+Needs pypdf (pip install pypdf).
+"""
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bible_refs import BOOK_ALTERNATIVES, book_key
+from writers import write_js, write_json, write_text
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'vers_diff_vite', 'src', 'data')
+PDF_NAME = 'SRBgrundtextskillnader.pdf'
+JS_NAME = 'verse_data_complete_1130.js'
+JSON_NAME = 'verse_data_complete_1130.json'
+VERSE_LIST_NAME = '1130_verse_SRB_extracted'
+DEFAULT_CATEGORY = 'minor'
+
+# Page number and running title at the top of every page
+PAGE_HEADER_RE = re.compile(r'^\s*\d+\s*\n\s*UN noter som visar[^\n]*\n?')
+# Verse header at the start of a line, as typed in the PDF: "Matt. 4:12.",
+# "Luk. 23: 43.", "Luk. 24 46.", "Matt: 23:19 .", "2 Kor 13:9.", "Joh. 7:53-8:11."
+VERSE_HEADER_RE = re.compile(
+    rf'^[ \t]*(?:(?P<number>[1-3])[ \t]*\.?[ \t]*)?(?P<book>{BOOK_ALTERNATIVES})[ \t]*[.:]?[ \t]*'
+    rf'(?P<chapter>\d+)[ \t]*[:.]?[ \t]*(?P<verse>\d+)'
+    rf'(?:[ \t]*[-–][ \t]*(?P<end>\d+(?:[ \t]*:[ \t]*\d+)?))?(?:[ \t]*\.(?!\.))?',
+    re.M)
+# "*UN: ...", "*UN utelämnar: ...", "**UN ...", "2UN ..." start the UN readings;
+# a few entries have an unmarked "UN: ..." instead
+NOTE_RE = re.compile(r'(?:\*+|(?<!\w)[1-9])[ \t]*UN\b[ \t]*:?[ \t]*')
+UNMARKED_NOTE_RE = re.compile(r'\bUN\b[ \t]*:?[ \t]*')
+# Words broken over lines: "fien \xad\nder" (soft hyphen) or "härlig -\nheten"
+WRAPPED_WORD_RE = re.compile(r'(\w)[ \t]*(?:\xad|-)[ \t]*\n[ \t]*(?=[a-zåäö])')
+SPACES_RE = re.compile(r'\s+')
+
+
+def verse_key(m):
+    """Dataset key ("Matt 1:25", "1 Kor 13:3", "Joh 7:53-8:11") of a header match"""
+    book = book_key(m['number'], m['book'])
+    if book is None:
+        return None
+    key = f"{book} {int(m['chapter'])}:{int(m['verse'])}"
+    if m['end']:
+        key += '-' + re.sub(r'\s+', '', m['end'])
+    return key
+
+
+def parse_page_text(text):
+    """Split one page into (text continuing the previous page's last entry, [(verse, text), ...])"""
+    text = PAGE_HEADER_RE.sub('', text, count=1)
+    entries = []
+    lead_end = None
+    for m in VERSE_HEADER_RE.finditer(text):
+        verse = verse_key(m)
+        if verse is None:
+            continue
+        if lead_end is None:
+            lead_end = m.start()
+        else:
+            entries[-1][1] = text[entries[-1][1]:m.start()]
+        entries.append([verse, m.end()])
+    if lead_end is None:
+        return text, []
+    entries[-1][1] = text[entries[-1][1]:]
+    return text[:lead_end], [tuple(entry) for entry in entries]
+
+
+def clean_text(text):
+    """One line of text: wrapped words rejoined (with a soft hyphen), markers and extra spaces gone"""
+    text = WRAPPED_WORD_RE.sub('\\1\xad', text)
+    return SPACES_RE.sub(' ', text.replace('*', '')).strip()
+
+
+def build_variant(verse, text):
+    """Variant record of one entry; several UN readings are joined with "; " """
+    parts = NOTE_RE.split(text)
+    if len(parts) == 1:
+        parts = UNMARKED_NOTE_RE.split(text, maxsplit=1)
+    tr_text = clean_text(parts[0])
+    notes = [note for note in map(clean_text, parts[1:]) if note]
+    un_text = '; '.join([note.rstrip('.') for note in notes[:-1]] + notes[-1:])
+    return {'verse': verse, 'tr_text': tr_text, 'un_text': un_text}
+
+
+# Per-process PDF reader used by parsing workers
+_worker_reader = None
+
+def init_page_worker(pdf_path):
+    global _worker_reader
+    _worker_reader = open_pdf(pdf_path)
+
+def parse_page_worker(index):
+    """Process-pool entry point: extract and parse one page of the worker's PDF"""
+    return parse_page_text(_worker_reader.pages[index].extract_text())
+
+
+def open_pdf(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise SystemExit("srb_variants.py needs pypdf: pip install pypdf")
+    return PdfReader(path)
+
+
+def iter_parsed_pages(pdf_path, workers=None):
+    """parse_page_text() of every page, in page order
+
+    With more than one worker, pages are extracted and parsed in a process
+    pool; results still come back in order.
+    """
+    page_count = len(open_pdf(pdf_path).pages)
+    workers = min(workers or os.cpu_count() or 1, page_count)
+    if workers <= 1:
+        reader = open_pdf(pdf_path)
+        for page in reader.pages:
+            yield parse_page_text(page.extract_text())
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_page_worker, initargs=(pdf_path,)) as pool:
+        yield from pool.map(parse_page_worker, range(page_count))
+
+
+def extract_variants(pdf_path, workers=None):
+    """Variant records of the PDF, in the order they appear, one per verse
+
+    A verse listed again (2 Thess 2:3 is, with the same text) keeps its
+    first entry; the app keys its list on the verse.
+    """
+    entries = []
+    for lead, page_entries in iter_parsed_pages(pdf_path, workers):
+        if entries and lead.strip():
+            verse, text = entries[-1]
+            entries[-1] = (verse, f"{text}\n{lead}")
+        entries.extend(page_entries)
+
+    variants = {}
+    for verse, text in entries:
+        variant = build_variant(verse, text)
+        if verse in variants:
+            same = variants[verse]['un_text'] == variant['un_text']
+            print(f"Duplicate entry for {verse} dropped ({'same' if same else 'different'} UN text)")
+            continue
+        variants[verse] = variant
+    return list(variants.values())
+
+
+# Strings, line comments, unquoted keys and trailing commas of a JS array literal
+JS_TOKEN_RE = re.compile(r'(?P<string>"(?:[^"\\]|\\.)*")|(?P<comment>//[^\n]*)|'
+                         r'(?P<key>\b[A-Za-z_]\w*\b)(?=\s*:)|(?P<comma>,)(?=\s*[\]}])')
+
+
+def load_dataset(path):
+    """Entries of an existing dataset: JSON, or the app's `export const allVariants = [...]` module
+
+    Returns [] if the file isn't there.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    if path.endswith('.js'):
+        text = text[text.index('['):text.rindex(']') + 1]
+        text = JS_TOKEN_RE.sub(lambda m: m['string'] or (f'"{m["key"]}"' if m['key'] else ''), text)
+    return json.loads(text)
+
+
+def merge_curated(variants, curated):
+    """Add category, impact and any other hand-made fields of curated entries by verse"""
+    curated_by_verse = {}
+    for entry in curated:
+        curated_by_verse.setdefault(entry.get('verse'), entry)
+    merged = []
+    for variant in variants:
+        previous = curated_by_verse.get(variant['verse'])
+        if previous:
+            entry = {'category': previous.get('category', DEFAULT_CATEGORY), **variant,
+                     'impact': previous.get('impact', '')}
+            entry.update((k, v) for k, v in previous.items() if k not in entry)
+        else:
+            impact = f"UN {variant['un_text']}".rstrip('.') if variant['un_text'] else ''
+            entry = {'category': DEFAULT_CATEGORY, **variant, 'impact': impact}
+        merged.append(entry)
+    return merged
+
+
+def write_dataset(variants, out_dir):
+    """Write the JS module, the JSON copy and the verse list; returns the paths written"""
+    paths = [os.path.join(out_dir, name) for name in (JS_NAME, JSON_NAME, VERSE_LIST_NAME)]
+    write_js(variants, paths[0], name='allVariants', export=True)
+    write_json(variants, paths[1])
+    write_text(paths[2], '\n'.join(v['verse'] for v in variants))
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate the verse-variant dataset from the SRB PDF")
+    parser.add_argument('pdf', nargs='?', default=os.path.join(DATA_DIR, PDF_NAME), help="SRBgrundtextskillnader.pdf")
+    parser.add_argument('--out-dir', default=DATA_DIR, help="directory for the dataset files")
+    parser.add_argument('--curated', help="dataset to carry categories and impact notes over from "
+                                          "(default: the JSON or JS dataset in --out-dir)")
+    parser.add_argument('--workers', type=int, default=0, help="parsing processes (0: one per CPU)")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    variants = extract_variants(args.pdf, args.workers)
+    curated_path = args.curated
+    if curated_path is None:
+        curated_path = os.path.join(args.out_dir, JSON_NAME)
+        if not os.path.exists(curated_path):
+            curated_path = os.path.join(args.out_dir, JS_NAME)
+    curated = load_dataset(curated_path)
+    variants = merge_curated(variants, curated)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    paths = write_dataset(variants, args.out_dir)
+    carried = len({v['verse'] for v in curated} & {v['verse'] for v in variants})
+    missing_un = sum(1 for v in variants if not v['un_text'])
+    print(f"{len(variants)} variants from {args.pdf} in {time.time() - start:.1f}s "
+          f"({carried} with curated categories, {missing_un} without UN text); "
+          f"written to {', '.join(paths)}")
+
+
+if __name__ == "__main__":
+    main()
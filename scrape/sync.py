@@ -0,0 +1,88 @@
+import json
+import os
+from datetime import datetime, timezone
+
+from writers import write_js, write_json
+
+# Listing fields that identify a question; a change in any of them means re-fetch
+LISTING_FIELDS = ('type', 'question')
+
+
+def load_snapshot(path):
+    """Records of a previous run's JSON output by ID, in file order ({} if none)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return {record['id']: record for record in json.load(f)}
+
+
+def diff_listing(snapshot, question_links):
+    """Compare listing links with snapshot records: (new, changed, removed IDs)
+
+    Links whose snapshot record holds an error count as changed, so failed
+    questions are retried on the next sync.
+    """
+    new, changed = [], []
+    for link in question_links:
+        previous = snapshot.get(link['id'])
+        if previous is None:
+            new.append(link)
+        elif previous.get('error') or any(previous.get(k) != link[k] for k in LISTING_FIELDS):
+            changed.append(link)
+    listed = {link['id'] for link in question_links}
+    removed = [qid for qid in snapshot if qid not in listed]
+    return new, changed, removed
+
+
+def sync_questions(scraper, snapshot_path, delta_path=None, js_path=None, **scrape_options):
+    """Bring a snapshot up to date with the listing, fetching only what changed
+
+    New and changed questions are scraped with scraper.scrape_questions();
+    questions gone from the listing are dropped. The merged snapshot is
+    written back to snapshot_path (in listing order), and a compact delta
+    (added/changed records, removed and failed IDs) to delta_path. A
+    question that fails keeps its previous record (new ones are left out)
+    and is retried next time. Returns the delta, or None if the listing
+    could not be read.
+    """
+    snapshot = load_snapshot(snapshot_path)
+    question_links = scraper.get_question_links()
+    if not question_links:
+        # Never treat an unreadable listing as "everything was removed"
+        return None
+
+    new, changed, removed = diff_listing(snapshot, question_links)
+    print(f"Sync: {len(new)} new, {len(changed)} changed, {len(removed)} removed, "
+          f"{len(question_links) - len(new) - len(changed)} unchanged")
+
+    fetched = {}
+    if new or changed:
+        for record in scraper.scrape_questions(new + changed, **scrape_options):
+            fetched[record['id']] = record
+
+    failed = [qid for qid, record in fetched.items() if record.get('error')]
+    delta = {
+        'synced_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'added': [fetched[link['id']] for link in new if link['id'] not in failed],
+        'changed': [fetched[link['id']] for link in changed if link['id'] not in failed],
+        'removed': removed,
+        'failed': failed,
+    }
+
+    merged = []
+    for link in question_links:
+        record = fetched.get(link['id'])
+        if record is None or record.get('error'):
+            record = snapshot.get(link['id'])
+        if record is not None and not record.get('error'):
+            merged.append(record)
+
+    write_json(merged, snapshot_path)
+    print(f"Snapshot with {len(merged)} questions saved to {snapshot_path}")
+    delta_path = delta_path or os.path.splitext(snapshot_path)[0] + '.delta.json'
+    write_json(delta, delta_path, indent=None)
+    print(f"Delta saved to {delta_path}")
+    if js_path:
+        write_js(merged, js_path)
+        print(f"Site data saved to {js_path}")
+    return delta
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import threading
+
+from bs4 import Tag
+
+
+def fingerprint(soup, depth=4):
+    """Hash of the page skeleton: tag names and classes of the top `depth` levels
+
+    Text and deeper markup are left out, so pages built from the same
+    template share a fingerprint however long their content is.
+    """
+    parts = []
+
+    def walk(tag, level):
+        for child in tag.children:
+            if isinstance(child, Tag):
+                parts.append(f"{level}:{child.name}.{'.'.join(child.get('class') or [])}")
+                if level < depth:
+                    walk(child, level + 1)
+
+    walk(soup, 1)
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def node_path(node):
+    """Structural path to node: [name, class, index among same-name siblings] per level"""
+    path = []
+    while node.parent is not None:
+        index = sum(1 for sibling in node.previous_siblings
+                    if isinstance(sibling, Tag) and sibling.name == node.name)
+        path.append([node.name, ' '.join(node.get('class') or []), index])
+        node = node.parent
+    return path[::-1]
+
+
+def resolve_path(soup, path):
+    """Node at path in soup, or None if the page doesn't have it"""
+    node = soup
+    for name, classes, index in path:
+        matches = [child for child in node.children if isinstance(child, Tag) and child.name == name]
+        if index >= len(matches) or ' '.join(matches[index].get('class') or []) != classes:
+            return None
+        node = matches[index]
+    return node
+
+
+class TemplateCache:
+    """Content-area locations learned per page template, persisted as JSON
+
+    Maps a skeleton fingerprint to the structural path of the content area
+    the full search chose, and the strategy that chose it. Call save() to
+    write newly learned templates back to disk; it merges them into the
+    file, so several processes can share one cache.
+    """
+
+    def __init__(self, path='template_cache.json'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.templates = self._read()
+        self.learned = set()
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key):
+        return self.templates.get(key)
+
+    def learn(self, key, node, strategy):
+        with self.lock:
+            self.templates[key] = {'path': node_path(node), 'strategy': strategy}
+            self.learned.add(key)
+
+    def save(self):
+        with self.lock:
+            if not self.learned:
+                return
+            templates = self._read()
+            templates.update((key, self.templates[key]) for key in self.learned)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(templates, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self.learned.clear()
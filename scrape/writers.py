@@ -0,0 +1,48 @@
+import gzip
+import json
+import os
+
+
+def write_bytes(filename, data):
+    """Replace filename with data in one step, so readers never see half a file"""
+    tmp_path = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, filename)
+
+
+def write_text(filename, text):
+    write_bytes(filename, text.encode('utf-8'))
+
+
+def write_json(data, filename, indent=2, compress=False):
+    """Write data as JSON (UTF-8, non-ASCII kept as is; no whitespace without indent)
+    
+    With compress, a gzipped copy is written to <filename>.gz as well.
+    """
+    separators = None if indent is not None else (',', ':')
+    text = json.dumps(data, ensure_ascii=False, indent=indent, separators=separators)
+    write_text(filename, text)
+    if compress:
+        # mtime=0 keeps the output identical when the data is, for caching and diffs
+        write_bytes(filename + '.gz', gzip.compress(text.encode('utf-8'), mtime=0))
+
+
+def write_js(data, filename, name='qaData', export=False):
+    """Write data as a script declaring `const <name> = [...];`, like scrape/qa_data.js
+
+    With export, it is an ES module (`export const <name> = ...`) like the verse-variant data.
+    """
+    prefix = "export const" if export else "const"
+    write_text(filename, f"{prefix} {name} = {json.dumps(data, ensure_ascii=False, indent=2)};")
+
+
+class TeeSink:
+    """Scraper sink that passes every record on to several sinks"""
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def write(self, record):
+        for sink in self.sinks:
+            sink.write(record)